@@ -1,20 +1,28 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import os
 import re
 import shutil
 from loguru import logger as log
 from pathlib import Path
 from subprocess import Popen, PIPE, STDOUT
+from typing import AsyncGenerator, Generator
+from accfix.report import AceReport
 
 
-ace_path = Path(shutil.which("ace"))
+ace_path = Path(shutil.which("ace") or "ace")
 log.debug(f"Using ACE at {ace_path}")
 ansi_escape = re.compile(r"\x1B[@-_][0-?]*[ -/]*[@-~]")
 
 
 def ace_check(fp):
-    # Run the ace command with subprocess.Popen
+    # type: (str|Path) -> Generator[str, None, AceReport]
+    """Run Ace, yield sanitized log lines and return the streamed report.
+
+    :raises RuntimeError: If Ace fails (after yielding the failure as last line).
+    """
     fp = Path(fp)
-    report_dir = fp.parent / f"{fp.stem}_report"
+    report_dir = report_dir_of(fp)
     report_dir.mkdir(exist_ok=True)
 
     # Run ACE Check
@@ -32,6 +40,75 @@ def ace_check(fp):
     if process.returncode != 0:
         log_output.append(f"Ace command failed with return code {process.returncode}")
         yield f"Ace command failed with return code {process.returncode}"
+        raise RuntimeError(f"Ace check failed for {fp}")
+    return AceReport.load(report_dir / "report.json")
+
+
+def report_dir_of(fp):
+    # type: (Path) -> Path
+    """Return the Ace report directory of an EPUB."""
+    return fp.parent / f"{fp.stem}_report"
+
+
+async def ace_check_async(fp):
+    # type: (str|Path) -> AsyncGenerator[str, None]
+    """Run Ace without blocking the event loop and yield sanitized log lines.
+
+    The Ace process is killed if the consumer is cancelled or closes the generator early.
+
+    :raises RuntimeError: If Ace fails (after yielding the failure as last line).
+    """
+    fp = Path(fp)
+    report_dir = report_dir_of(fp)
+    report_dir.mkdir(exist_ok=True)
+    process = await asyncio.create_subprocess_exec(
+        str(ace_path), "-f", "-o", str(report_dir), str(fp), stdout=PIPE, stderr=STDOUT
+    )
+    try:
+        async for line in process.stdout:
+            stripped_line = ansi_escape.sub("", line.decode("utf-8", "replace")).strip()
+            log.info(stripped_line)
+            yield stripped_line
+        await process.wait()
+        if process.returncode != 0:
+            yield f"Ace command failed with return code {process.returncode}"
+            raise RuntimeError(f"Ace check failed for {fp}")
+    finally:
+        if process.returncode is None:
+            log.warning(f"Killing Ace check of {fp.name}")
+            process.kill()
+            await process.wait()
+
+
+async def check_one(fp, semaphore, timeout=None):
+    # type: (Path, asyncio.Semaphore, float|None) -> AceReport
+    """Run a single Ace check under semaphore and return the streamed report.
+
+    :raises TimeoutError: If the check takes longer than timeout seconds.
+    :raises RuntimeError: If Ace fails.
+    """
+    async with semaphore:
+        async with asyncio.timeout(timeout):
+            async for _ in ace_check_async(fp):
+                pass
+        return AceReport.load(report_dir_of(fp) / "report.json")
+
+
+async def check_many(fps, limit=None, timeout=None):
+    # type: (list[str|Path], int|None, float|None) -> dict[Path, AceReport|BaseException]
+    """Run Ace checks of many EPUBs concurrently.
+
+    :param fps: EPUB files to check.
+    :param limit: Maximum number of concurrent checks (defaults to the number of CPUs).
+    :param timeout: Timeout in seconds per check. Timed out checks are killed.
+    :return: Report or raised exception per EPUB.
+    """
+    semaphore = asyncio.Semaphore(limit or os.cpu_count() or 1)
+    fps = [Path(fp) for fp in fps]
+    results = await asyncio.gather(
+        *(check_one(fp, semaphore, timeout) for fp in fps), return_exceptions=True
+    )
+    return dict(zip(fps, results))
 
 
 if __name__ == "__main__":
@@ -1,53 +1,183 @@
-from typing import Generator
+import os
+import time
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from pathlib import Path
+from typing import Callable, Generator, Iterator
 
 from loguru import logger as log
 from lxml.etree import ElementTree
 from lxml import etree
 from accfix.epub import Epub
+from accfix.instrument import PROFILE_ENV, Progress, Timings, profiled
 from accfix.lang import detect_epub_lang
+from accfix.prescan import PageIndex, needs_fix
 
+FIXER_VERSION = "1"  # Bump whenever the output of ace_fix_mec changes
+XHTML_A = "{http://www.w3.org/1999/xhtml}a"
+XHTML_DIV = "{http://www.w3.org/1999/xhtml}div"
 
-def ace_fix_mec(epub: Epub):
-    """Static fixing of Accessibility for MagicEpub Fixed Layout EPUBs"""
-    lang = detect_epub_lang(epub)
-    yield f"Detected language: {lang}"
-
-    # Fix OPF
-    yield "Fixing OPF..."
-    opf_tree = epub.opf_tree()
-    set_lang(opf_tree, lang)
-    yield "Adding accessibility metadata..."
-    for message in add_acc_meta_fxl(opf_tree):
-        yield message
-    etree.indent(opf_tree, space="  ")  # Ensure proper indentation
-    data = etree.tostring(opf_tree, xml_declaration=True, encoding="utf-8", pretty_print=True)
-    epub.write(epub.opf_path(), data)
-    yield "OPF fixed and updated"
-
-    # Fix NAV
-    yield "Fixing NAV..."
-    nav_tree = epub.nav_tree()
-    fix_nav(nav_tree)
-    set_lang(nav_tree, lang)
-    data = etree.tostring(nav_tree, xml_declaration=True, encoding="utf-8", pretty_print=True)
-    epub.write(epub.nav_path(), data)
-    yield "NAV fixed and updated"
-
-    # Fix CONTENT
-    yield "Fixing content pages..."
-    for i, page_path in enumerate(epub.pages(), 1):
-        yield f"Processing page {i}..."
+PageResult = tuple[bytes, Counter, Timings]
+
+
+def ace_fix_mec(epub, executor=None, timings=None):
+    # type: (Epub, Executor|None, Timings|None) -> Generator[Progress, None, Epub]
+    """Static fixing of Accessibility for MagicEpub Fixed Layout EPUBs
+
+    Runs under cProfile if $ACCFIX_PROFILE is set (see `profiled`).
+
+    :param epub: The EPUB to fix in place.
+    :param executor: Optional thread or process pool to fix content pages in parallel.
+    :param timings: Optional collector of per-stage timing and byte counts.
+    """
+    steps = fix_steps(epub, executor, timings or Timings())
+    if os.environ.get(PROFILE_ENV):
+        steps = profiled(steps)
+    return (yield from steps)
+
+
+def fix_steps(epub, executor, timings):
+    # type: (Epub, Executor|None, Timings) -> Generator[Progress, None, Epub]
+    """Run the fixes of `ace_fix_mec` and yield progress events."""
+    with timings.measure("language"):
+        lang = detect_epub_lang(epub)
+    yield Progress("language", f"Detected language: {lang}", lang=lang)
+    source = epub.path
+    index = PageIndex(source, f"{FIXER_VERSION}:{lang}")
+
+    with epub.transaction():
+        # Fix OPF
+        yield Progress("opf", "Fixing OPF...")
+        opf_tree = epub.opf_tree()
+        set_lang(opf_tree, lang)
+        yield Progress("opf", "Adding accessibility metadata...")
+        for message in add_acc_meta_fxl(opf_tree):
+            yield Progress("opf", message)
+        etree.indent(opf_tree, space="  ")  # Ensure proper indentation
+        data = etree.tostring(opf_tree, xml_declaration=True, encoding="utf-8", pretty_print=True)
+        written = write_changed(epub, epub.opf_path(), data)
+        yield Progress("opf", "OPF fixed and updated")
+
+        # Fix NAV
+        yield Progress("nav", "Fixing NAV...")
+        nav_tree = epub.nav_tree()
+        fix_nav(nav_tree)
+        set_lang(nav_tree, lang)
+        data = etree.tostring(nav_tree, xml_declaration=True, encoding="utf-8", pretty_print=True)
+        written += write_changed(epub, epub.nav_path(), data)
+        yield Progress("nav", "NAV fixed and updated")
+
+        # Fix CONTENT
+        pending = pending_pages(epub, lang, index, timings)
+        total = len(pending)
+        skipped = len(epub.pages()) - total
+        yield Progress("pages", f"Fixing content pages ({skipped} already fixed)...", 0, total)
+        hits = Counter()
+        originals = dict(pending)
+        pages = fixed_pages(pending, lang, executor)
+        for i, (page_path, (data, page_hits, page_timings)) in enumerate(pages, 1):
+            yield Progress("pages", f"Processing page {i}...", i, total)
+            written += write_changed(epub, page_path, data, originals[page_path])
+            index.record(page_path, data)
+            hits.update(page_hits)
+            timings.merge(page_timings)
+        yield Progress("pages", "All content pages fixed and updated", total, total)
+        yield Progress("pages", rule_report(hits), total, total)
+        yield Progress("write", "Writing EPUB archive...")
+        start = time.perf_counter()
+
+    timings.add("write", time.perf_counter() - start, written)
+    if epub.path == source:  # Fixed in place, the index describes the pages of source
+        index.save()
+    epub.materialize()  # A requested clone is created even if the book needed no changes
+    log.debug(timings.report())
+    yield Progress("done", timings.report())
+    yield Progress("done", "Accessibility fixes completed successfully!")
+    return epub
+
+
+def pending_pages(epub, lang, index, timings):
+    # type: (Epub, str, PageIndex, Timings) -> list[tuple[Path, bytes]]
+    """Read all spine pages and return those that may still need fixes with their content.
+
+    Pages recorded in the index or passing the byte-level pre-scan are recorded and skipped.
+    """
+    pending = []
+    for page_path in epub.pages():
+        start = time.perf_counter()
         data = epub.read(page_path)
+        timings.add("read", time.perf_counter() - start, len(data))
+        if index.known(page_path, data) or not needs_fix(data, lang):
+            index.record(page_path, data)
+        else:
+            pending.append((page_path, data))
+    return pending
+
+
+def fixed_pages(pending, lang, executor=None, rules=None):
+    # type: (list[tuple[Path, bytes]], str, Executor|None, list[Rule]|None) -> Iterator[tuple[Path, PageResult]]
+    """Return an iterator over the fixed content of pages in the given order.
+
+    :param pending: Paths and contents of the pages to fix.
+    :param lang: ISO 639-1 language code to set on the pages.
+    :param executor: Optional pool that runs `fix_page` concurrently.
+    :param rules: Page rules to apply (defaults to `PAGE_RULES`). They are sent to the workers
+        with each task, so rules registered after the pool started apply too.
+    """
+    pages = [page_path for page_path, _ in pending]
+    contents = [data for _, data in pending]
+    rules = list(PAGE_RULES if rules is None else rules)
+    if executor is None:
+        results = map(fix_page, contents, repeat(lang), repeat(rules))
+    else:
+        results = executor.map(fix_page, contents, repeat(lang), repeat(rules), chunksize=8)
+    return zip(pages, results)
+
+
+def write_changed(epub, path, data, current=None):
+    # type: (Epub, Path, bytes, bytes|None) -> int
+    """Write data to a member unless it already has that content.
+
+    :param current: Current content of the member if already read.
+    :return: Number of written bytes.
+    """
+    if (epub.read(path) if current is None else current) == data:
+        return 0
+    epub.write(path, data)
+    return len(data)
+
+
+def fix_page(data, lang, rules=None):
+    # type: (bytes, str, list[Rule]|None) -> PageResult
+    """Apply all content page fixes to serialized XHTML.
+
+    :param rules: Page rules to apply (defaults to `PAGE_RULES`).
+    :return: The new serialization, the number of hits per page rule and the stage timings.
+    """
+    timings = Timings()
+    with timings.measure("parse", len(data)):
         html_tree = ElementTree(etree.fromstring(data))
+    with timings.measure("transform"):
         set_lang(html_tree, lang)
-        fix_trn_links(html_tree)
-        fix_hotspot_links_kf8(html_tree)
-        data = etree.tostring(html_tree, xml_declaration=True, encoding="utf-8", pretty_print=True)
-        epub.write(page_path, data)
-    yield "All content pages fixed and updated"
+        hits = apply_rules(html_tree, PAGE_RULES if rules is None else rules)
+    start = time.perf_counter()
+    data = etree.tostring(html_tree, xml_declaration=True, encoding="utf-8", pretty_print=True)
+    timings.add("serialize", time.perf_counter() - start, len(data))
+    return data, hits, timings
 
-    yield "Accessibility fixes completed successfully!"
-    return epub
+
+def page_executor(workers=None, processes=True):
+    # type: (int|None, bool) -> Executor
+    """Create a pool for parallel page fixing.
+
+    :param workers: Number of workers (defaults to the number of CPUs).
+    :param processes: Use worker processes instead of threads.
+    """
+    if processes:
+        return ProcessPoolExecutor(max_workers=workers)
+    return ThreadPoolExecutor(max_workers=workers)
 
 
 def set_lang(tree, lang):
@@ -129,33 +259,93 @@ def fix_nav(nav_tree):
     return nav_tree
 
 
+@dataclass
+class Rule:
+    """Element fix applied to matching elements during a single tree walk"""
+
+    name: str
+    tag: str
+    match: Callable[[etree._Element], bool]
+    fix: Callable[[etree._Element], None]
+
+
+def apply_rules(tree, rules):
+    # type: (ElementTree, list[Rule]) -> Counter
+    """Walk the tree once and apply every rule to the elements it matches.
+
+    :return: Number of fixed elements per rule name.
+    """
+    by_tag = {}  # type: dict[str, list[Rule]]
+    for rule in rules:
+        by_tag.setdefault(rule.tag, []).append(rule)
+    hits = Counter()
+    for element in tree.getroot().iter(*by_tag):
+        for rule in by_tag[element.tag]:
+            if rule.match(element):
+                rule.fix(element)
+                hits[rule.name] += 1
+    return hits
+
+
+def register_rule(rule):
+    # type: (Rule) -> Rule
+    """Add a rule to the content page rules applied by `fix_page`.
+
+    Rules are pickled to worker processes, so match and fix must be module level functions.
+    """
+    PAGE_RULES.append(rule)
+    return rule
+
+
+def rule_report(hits):
+    # type: (Counter) -> str
+    """Format rule hit counts as a progress message."""
+    counts = ", ".join(f"{rule.name}={hits[rule.name]}" for rule in PAGE_RULES)
+    return f"Rule hits: {counts}"
+
+
+def is_trn_link(element):
+    # type: (etree._Element) -> bool
+    """Match MagicEpub trn_link anchors"""
+    return element.get("class") == "trn_link"
+
+
+def is_hotspot(element):
+    # type: (etree._Element) -> bool
+    """Match MagicEpub hotspot containers"""
+    return element.get("class") == "hotspot"
+
+
+def set_link_title(element):
+    # type: (etree._Element) -> None
+    """Add required title attribute to a link element"""
+    element.set("title", "Link area")
+
+
+def set_hotspot_link_title(element):
+    # type: (etree._Element) -> None
+    """Add required title attribute to the first link within a hotspot"""
+    link = element.find(f".//{XHTML_A}")
+    if link is not None:
+        set_link_title(link)
+
+
+TRN_LINK_RULE = Rule("trn_link_title", XHTML_A, is_trn_link, set_link_title)
+HOTSPOT_RULE = Rule("hotspot_link_title", XHTML_DIV, is_hotspot, set_hotspot_link_title)
+PAGE_RULES = [TRN_LINK_RULE, HOTSPOT_RULE]  # type: list[Rule]
+
+
 def fix_trn_links(html_tree):
     # type: (ElementTree) -> ElementTree
     """Add required title attribute to MagicEpub trn_link elements"""
-    root = html_tree.getroot()
-    namespaces = {
-        "xhtml": "http://www.w3.org/1999/xhtml",
-        "epub": "http://www.idpf.org/2007/ops",
-    }
-    trn_links = root.xpath('//xhtml:a[@class="trn_link"]', namespaces=namespaces)
-    for el in trn_links:
-        el.set("title", "Link area")
+    apply_rules(html_tree, [TRN_LINK_RULE])
     return html_tree
 
 
 def fix_hotspot_links_kf8(html_tree):
     # type: (ElementTree) -> ElementTree
     """Add required title attribute to MagicEpub hotspot link elements"""
-    root = html_tree.getroot()
-    namespaces = {
-        "xhtml": "http://www.w3.org/1999/xhtml",
-        "epub": "http://www.idpf.org/2007/ops",
-    }
-    hot_spot_divs = root.xpath('//xhtml:div[@class="hotspot"]', namespaces=namespaces)
-    for div in hot_spot_divs:
-        link = div.find(".//xhtml:a", namespaces=namespaces)
-        if link is not None:
-            link.set("title", "Link area")
+    apply_rules(html_tree, [HOTSPOT_RULE])
     return html_tree
 
 
@@ -163,5 +353,6 @@ if __name__ == "__main__":
     fp = r"../scratch/test1.epub"
     cp = "../scratch/test1_clone.epub"
     epb = Epub(fp, clone=True, clone_path="../scratch/test1_clone.epub")
-    for message in ace_fix_mec(epb):
-        print(message)
+    with page_executor() as pool:
+        for event in ace_fix_mec(epb, pool):
+            print(event)
@@ -0,0 +1,191 @@
+"""Pool of warm, long-lived DAISY Ace workers"""
+
+import json
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from subprocess import PIPE, STDOUT, Popen, TimeoutExpired
+from typing import Generator
+from loguru import logger as log
+from accfix.ace_check import ansi_escape
+from accfix.report import AceReport
+
+WORKER_SCRIPT = Path(__file__).with_name("ace_worker.js")
+WORKER_CMD_ENV = "ACCFIX_ACE_WORKER"
+DONE = "@@ACE-DONE "
+JOB_TIMEOUT = 600.0  # Seconds before a hung worker (e.g. its headless browser) is killed
+
+
+def worker_command():
+    # type: () -> list[str]
+    """Return the worker command from $ACCFIX_ACE_WORKER or the bundled Node.js worker."""
+    command = os.environ.get(WORKER_CMD_ENV)
+    return command.split() if command else ["node", str(WORKER_SCRIPT)]
+
+
+class AceJob:
+    def __init__(self, fp):
+        # type: (str|Path) -> None
+        """Ace check of a single EPUB submitted to an `AceService`.
+
+        :param fp: Path of the EPUB to check. The report is written next to it.
+        """
+        self.fp = Path(fp).resolve()
+        self.report_dir = self.fp.parent / f"{self.fp.stem}_report"
+        self.lines = queue.Queue()  # type: queue.Queue[str|None]
+        self.report = Future()  # type: Future[AceReport]
+
+    def __repr__(self):
+        return f'AceJob("{self.fp.name}")'
+
+    def logs(self):
+        # type: () -> Generator[str, None, None]
+        """Yield sanitized log lines of the check until it is finished."""
+        while (line := self.lines.get()) is not None:
+            yield line
+
+    def result(self, timeout=None):
+        # type: (float|None) -> AceReport
+        """Wait for and return the Ace report."""
+        return self.report.result(timeout)
+
+
+class AceWorker:
+    def __init__(self, command, timeout=JOB_TIMEOUT):
+        # type: (list[str], float|None) -> None
+        """Long-lived Ace process that checks one job at a time.
+
+        :param command: Worker command.
+        :param timeout: Seconds per job before the process is killed and restarted.
+        """
+        self.command = command
+        self.timeout = timeout
+        self.process = None  # type: Popen|None
+        self.expired = False
+
+    def start(self):
+        # type: () -> None
+        """Start the worker process if it is not running."""
+        if self.process is None or self.process.poll() is not None:
+            log.debug(f"Starting Ace worker: {' '.join(self.command)}")
+            self.process = Popen(
+                self.command, stdin=PIPE, stdout=PIPE, stderr=STDOUT, text=True, bufsize=1
+            )
+
+    def run(self, job):
+        # type: (AceJob) -> None
+        """Check the EPUB of job, streaming its log lines and resolving its report."""
+        job.report_dir.mkdir(exist_ok=True)
+        try:
+            self.start()
+            request = {"epub": str(job.fp), "outdir": str(job.report_dir)}
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+            job.report.set_result(self.collect(job))
+        except Exception as e:
+            job.report.set_exception(e)
+        finally:
+            job.lines.put(None)
+
+    def collect(self, job):
+        # type: (AceJob) -> AceReport
+        """Forward worker output to job until its result line and load the report.
+
+        :raises TimeoutError: If the job takes longer than `timeout` seconds.
+        """
+        self.expired = False
+        timer = threading.Timer(self.timeout, self.expire) if self.timeout else None
+        if timer:
+            timer.start()
+        try:
+            for line in self.process.stdout:
+                if line.startswith(DONE):
+                    result = json.loads(line[len(DONE) :])
+                    if result["status"] != 0:
+                        raise RuntimeError(f"Ace check failed for {job.fp.name}")
+                    return AceReport.load(result["report"])
+                stripped_line = ansi_escape.sub("", line).strip()
+                log.info(stripped_line)
+                job.lines.put(stripped_line)
+        finally:
+            if timer:
+                timer.cancel()
+        code = self.process.wait()
+        if self.expired:
+            raise TimeoutError(f"Ace check of {job.fp.name} timed out after {self.timeout}s")
+        raise RuntimeError(f"Ace worker exited with code {code}")
+
+    def expire(self):
+        # type: () -> None
+        """Kill the worker process of a job over its deadline (restarted by the next job)."""
+        log.warning(f"Killing Ace worker after {self.timeout}s")
+        self.expired = True
+        self.process.kill()
+
+    def stop(self):
+        # type: () -> None
+        """Close the worker input and wait for the process to exit."""
+        if self.process is not None and self.process.poll() is None:
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=30)
+            except TimeoutExpired:
+                self.process.kill()
+
+
+class AceService:
+    def __init__(self, workers=2, command=None, timeout=JOB_TIMEOUT):
+        # type: (int, list[str]|None, float|None) -> None
+        """Queue of Ace checks served by warm worker processes.
+
+        :param workers: Number of long-lived Ace worker processes.
+        :param command: Worker command (defaults to `worker_command()`).
+        :param timeout: Seconds per check before its worker is killed and restarted.
+        """
+        self.jobs = queue.Queue()  # type: queue.Queue[AceJob|None]
+        self.command = command or worker_command()
+        self.timeout = timeout
+        self.threads = [
+            threading.Thread(target=self.serve, name=f"ace-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def serve(self):
+        # type: () -> None
+        """Run queued jobs on one worker process until the service is closed."""
+        worker = AceWorker(self.command, self.timeout)
+        while (job := self.jobs.get()) is not None:
+            worker.run(job)
+        worker.stop()
+
+    def submit(self, fp):
+        # type: (str|Path) -> AceJob
+        """Queue an Ace check of the EPUB at fp."""
+        job = AceJob(fp)
+        self.jobs.put(job)
+        return job
+
+    def check(self, fp):
+        # type: (str|Path) -> Generator[str, None, AceReport]
+        """Check an EPUB, yielding log lines like `ace_check` and returning the report."""
+        job = self.submit(fp)
+        yield from job.logs()
+        return job.result()
+
+    def close(self):
+        # type: () -> None
+        """Stop all workers after the queued jobs are done."""
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
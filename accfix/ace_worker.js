@@ -0,0 +1,73 @@
+// Long-lived DAISY Ace worker used by accfix/ace_service.py
+//
+// Reads one JSON job per stdin line ({"epub": "...", "outdir": "..."}), streams Ace log output
+// to stdout and finishes every job with a single result line:
+//   @@ACE-DONE {"status": 0, "report": "<outdir>/report.json"}
+// The headless browser of the axe runner is launched once and reused for all jobs.
+
+const path = require("path");
+const readline = require("readline");
+const { execSync } = require("child_process");
+
+const DONE = "@@ACE-DONE ";
+
+function load(name) {
+    const root = globalRoot();
+    const roots = [process.env.ACE_MODULES, root, path.join(root, "@daisy/ace/node_modules")];
+    for (const root of [undefined, ...roots]) {
+        try {
+            return require(root ? path.join(root, name) : name);
+        } catch (e) {
+            if (e.code !== "MODULE_NOT_FOUND") throw e;
+        }
+    }
+    throw new Error(`Cannot find ${name}, set ACE_MODULES to the node_modules dir of Ace`);
+}
+
+function globalRoot() {
+    try {
+        return execSync("npm root -g", { encoding: "utf-8" }).trim();
+    } catch (e) {
+        return "";
+    }
+}
+
+const ace = load("@daisy/ace-core");
+const axeRunner = load("@daisy/ace-axe-runner-puppeteer");
+
+// Keep the browser warm: launch once, ignore per-check launch/close calls
+const launched = axeRunner.launch();
+const warmRunner = Object.assign({}, axeRunner, {
+    launch: () => launched,
+    close: () => Promise.resolve(),
+});
+
+async function run(job) {
+    const outdir = path.resolve(job.outdir);
+    const options = {
+        cwd: process.cwd(),
+        outdir,
+        verbose: false,
+        silent: false,
+        jobId: "",
+        lang: "en",
+    };
+    await ace(path.resolve(job.epub), options, warmRunner);
+    return path.join(outdir, "report.json");
+}
+
+const queue = readline.createInterface({ input: process.stdin });
+let chain = Promise.resolve();
+queue.on("line", (line) => {
+    chain = chain.then(async () => {
+        let result;
+        try {
+            result = { status: 0, report: await run(JSON.parse(line)) };
+        } catch (e) {
+            console.log(String(e && e.stack ? e.stack : e));
+            result = { status: 1, report: null };
+        }
+        process.stdout.write(DONE + JSON.stringify(result) + "\n");
+    });
+});
+queue.on("close", () => chain.then(() => axeRunner.close()).then(() => process.exit(0)));
@@ -0,0 +1,87 @@
+"""Benchmarks for EPUB archive operations"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from accfix.epub import Epub
+from accfix.synth import make_epub
+
+LANG_PROBE = """
+import resource, time
+start = time.perf_counter()
+import accfix.ace_fix
+from accfix.lang import detect_lang
+imported = time.perf_counter() - start
+detect_lang("Die Sonne scheint heute sehr hell und die Kinder spielen im Garten.")
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(imported, time.perf_counter() - start, rss)
+"""
+
+
+def rewrite_pages(epub):
+    # type: (Epub) -> int
+    """Rewrite every spine page of the EPUB with its own content and return the page count."""
+    pages = epub.pages()
+    for page in pages:
+        epub.write(page, epub.read(page))
+    return len(pages)
+
+
+def bench_write_modes(pages=500, image_size=50_000):
+    # type: (int, int) -> dict[str, float]
+    """Compare per-write member removal with a single transaction commit.
+
+    :param pages: Number of pages of the synthetic EPUB.
+    :param image_size: Background image size per page in bytes.
+    :return: Seconds spent rewriting all pages per write mode.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = make_epub(Path(temp_dir) / "synthetic.epub", pages, image_size)
+
+        epub = Epub(source, clone_path=Path(temp_dir) / "per_write.epub")
+        start = time.perf_counter()
+        rewrite_pages(epub)
+        results["per_write"] = time.perf_counter() - start
+        epub.close()
+
+        epub = Epub(source, clone_path=Path(temp_dir) / "transaction.epub")
+        start = time.perf_counter()
+        with epub.transaction():
+            rewrite_pages(epub)
+        results["transaction"] = time.perf_counter() - start
+        epub.close()
+    return results
+
+
+def bench_lang_startup(languages="en,de,fr,es,it"):
+    # type: (str) -> dict[str, dict[str, float]]
+    """Measure import time, time to first detection and peak RSS in fresh interpreters.
+
+    :param languages: Candidate languages for the restricted run (ACCFIX_LANGUAGES).
+    :return: Measurements for detection over all languages and over the restricted set.
+    """
+    results = {}
+    for mode, value in (("all", ""), ("restricted", languages)):
+        env = dict(os.environ, ACCFIX_LANGUAGES=value, LOGURU_LEVEL="WARNING")
+        out = subprocess.run(
+            [sys.executable, "-c", LANG_PROBE], env=env, capture_output=True, text=True, check=True
+        )
+        imported, detected, rss = out.stdout.split()
+        results[mode] = {
+            "import_s": float(imported),
+            "first_detect_s": float(detected),
+            "max_rss_mb": int(rss) / 1024,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    for mode, seconds in bench_write_modes(n_pages).items():
+        print(f"{mode:<12} {seconds:8.3f}s")
+    for mode, stats in bench_lang_startup().items():
+        print(f"{mode:<12} " + " ".join(f"{k}={v:.3f}" for k, v in stats.items()))
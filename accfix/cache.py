@@ -0,0 +1,120 @@
+"""On-disk cache of fixed EPUBs keyed by input content hash"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from loguru import logger as log
+from accfix.ace_fix import FIXER_VERSION
+
+CACHE_DIR_ENV = "ACCFIX_CACHE_DIR"
+CACHE_SIZE_ENV = "ACCFIX_CACHE_SIZE"
+DEFAULT_SIZE = 2 * 2**30
+EPUB_NAME = "fixed.epub"
+META_NAME = "meta.json"
+
+
+@dataclass
+class CacheEntry:
+    """Cached fix result"""
+
+    path: Path
+    lang: str | None
+
+
+def content_key(source):
+    # type: (str|Path|bytes|memoryview) -> str
+    """Return the cache key of an input EPUB given as path or bytes.
+
+    The key combines the SHA-256 of the input bytes with the fixer version.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest = hashlib.sha256(source).hexdigest()
+    else:
+        with open(source, "rb") as infile:
+            digest = hashlib.file_digest(infile, "sha256").hexdigest()
+    return f"{digest}-{FIXER_VERSION}"
+
+
+class ResultCache:
+    def __init__(self, root=None, max_bytes=None):
+        # type: (str|Path|None, int|None) -> None
+        """LRU cache of fixed EPUBs and their detected language.
+
+        :param root: Cache directory (defaults to $ACCFIX_CACHE_DIR or ~/.cache/accfix).
+        :param max_bytes: Size limit (defaults to $ACCFIX_CACHE_SIZE or 2 GiB).
+        """
+        root = root or os.environ.get(CACHE_DIR_ENV) or Path.home() / ".cache" / "accfix"
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or int(os.environ.get(CACHE_SIZE_ENV, DEFAULT_SIZE))
+
+    def __repr__(self):
+        return f'ResultCache("{self.root}")'
+
+    def get(self, key):
+        # type: (str) -> CacheEntry|None
+        """Return the cached result for key and mark it as recently used."""
+        entry_dir = self.root / key
+        try:
+            meta = json.loads((entry_dir / META_NAME).read_text(encoding="utf-8"))
+            os.utime(entry_dir)
+        except (FileNotFoundError, ValueError):
+            return None
+        log.debug(f"Cache hit: {key}")
+        return CacheEntry(path=entry_dir / EPUB_NAME, lang=meta.get("lang"))
+
+    def put(self, key, fixed, lang=None):
+        # type: (str, str|Path|bytes|memoryview, str|None) -> CacheEntry
+        """Store a fixed EPUB under key and evict least recently used entries over the limit.
+
+        :param key: Cache key of the input (see `content_key`).
+        :param fixed: Path or content of the fixed EPUB.
+        :param lang: Detected language of the EPUB.
+        """
+        entry_dir = self.root / key
+        temp_dir = Path(tempfile.mkdtemp(dir=self.root, prefix=".tmp-"))
+        if isinstance(fixed, (bytes, bytearray, memoryview)):
+            (temp_dir / EPUB_NAME).write_bytes(fixed)
+        else:
+            shutil.copyfile(fixed, temp_dir / EPUB_NAME)
+        (temp_dir / META_NAME).write_text(json.dumps({"lang": lang}), encoding="utf-8")
+        try:
+            temp_dir.rename(entry_dir)
+        except OSError:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        log.debug(f"Cache store: {key}")
+        self.evict(keep=key)
+        return CacheEntry(path=entry_dir / EPUB_NAME, lang=lang)
+
+    def evict(self, keep=None):
+        # type: (str|None) -> int
+        """Remove least recently used entries until the cache fits its size limit.
+
+        :param keep: Key of an entry that is never removed (e.g. the one just stored).
+        :return: Number of removed entries.
+        """
+        entries = [p for p in self.root.iterdir() if p.is_dir() and not p.name.startswith(".")]
+        entries.sort(key=lambda p: p.stat().st_mtime)
+        sizes = {p: dir_size(p) for p in entries}
+        total, removed = sum(sizes.values()), 0
+        for entry_dir in entries:
+            if total <= self.max_bytes:
+                break
+            if entry_dir.name == keep:
+                continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= sizes[entry_dir]
+            removed += 1
+        if removed:
+            log.debug(f"Evicted {removed} cache entries")
+        return removed
+
+
+def dir_size(path):
+    # type: (Path) -> int
+    """Return the total size of the files in a directory."""
+    return sum(p.stat().st_size for p in path.iterdir() if p.is_file())
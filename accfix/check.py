@@ -2,7 +2,8 @@ from pathlib import Path
 import zipfile
 from lxml import etree
 from subprocess import run
-import json
+from accfix.report import AceReport
+from accfix.text import xml_text  # noqa: F401
 
 
 def is_epub(fp: str | Path) -> bool:
@@ -43,25 +44,22 @@ def read_opf(fp: str | Path):
     return tree
 
 
-def xml_text(xml: etree._Element) -> str | None:
-    """Extract plaintext content from XML tree"""
-    content = [t.strip() for t in xml.xpath("//text()") if t.strip()]
-    return "\n".join(content)
-
-
-def check(fp: str | Path) -> dict:
+def run_ace(fp: str | Path) -> Path:
+    """Run an ACE check and return the path of its report.json"""
     # Prepare output path
     fp = Path(fp)
     report_dir = fp.parent / f"{fp.stem}_report"
     report_dir.mkdir(exist_ok=True)
-    report_file = report_dir / "report.json"
 
     # Run ACE Check
     cmd = ["ace", "-f", "-o", report_dir, fp]
-    run(cmd, shell=True)
+    run(cmd)
+    return report_dir / "report.json"
+
 
-    # Return Result data
-    return json.load(report_file.open(encoding="utf-8"))
+def check(fp: str | Path) -> AceReport:
+    """Run an ACE check and return the streamed report model"""
+    return AceReport.load(run_ace(fp))
 
 
 if __name__ == "__main__":
@@ -73,5 +71,5 @@ if __name__ == "__main__":
     # opf_tree = read_opf(file)
     # print(opf_tree)
     # print(detect_lang("Guten Tag. Wie geht es ihnen"))
-    # print(xml_text(opf_tree))
+    # print(xml_text(etree.tostring(opf_tree)))
     # print(check(Path("../scratch/test1_fix.epub")))
@@ -0,0 +1,167 @@
+"""Command line interface for fixing whole catalogues of EPUBs"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterator
+from loguru import logger as log
+from accfix.ace_fix import ace_fix_mec
+from accfix.cache import ResultCache, content_key
+from accfix.epub import Epub
+
+SUFFIX = "_fix"
+
+
+def collect_inputs(patterns, suffix=SUFFIX):
+    # type: (list[str], str) -> list[Path]
+    """Resolve files, directories (recursively) and glob patterns to unique EPUB paths.
+
+    :param patterns: File paths, directory paths or glob patterns.
+    :param suffix: Stem suffix of fixed outputs which are skipped when scanning directories and
+        globs (files given explicitly are always used).
+    """
+    found = {}  # type: dict[Path, None]
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_file():
+            if path.suffix == ".epub":
+                found.setdefault(path.resolve(), None)
+            continue
+        if path.is_dir():
+            candidates = sorted(path.rglob("*.epub"))
+        else:
+            candidates = sorted(Path(p) for p in glob.glob(pattern, recursive=True))
+        for candidate in candidates:
+            if candidate.suffix == ".epub" and not candidate.stem.endswith(suffix):
+                found.setdefault(candidate.resolve(), None)
+    return list(found)
+
+
+def output_path(src, output_dir=None):
+    # type: (Path, Path|None) -> Path
+    """Return the path of the fixed EPUB for an input."""
+    name = f"{src.stem}{SUFFIX}{src.suffix}"
+    return (output_dir / name) if output_dir else src.with_name(name)
+
+
+def is_up_to_date(src, dst):
+    # type: (Path, Path) -> bool
+    """Check if the output exists and is not older than its input."""
+    return dst.exists() and dst.stat().st_mtime >= src.stat().st_mtime
+
+
+def fix_book(src, dst, cache=None):
+    # type: (Path, Path, ResultCache|None) -> dict
+    """Fix a single EPUB into dst and return its summary record.
+
+    The output is written to a partial file first and only renamed on success.
+
+    :param src: Input EPUB.
+    :param dst: Output path of the fixed EPUB.
+    :param cache: Optional result cache to reuse and store fixed EPUBs.
+    """
+    record = {"input": str(src), "output": str(dst), "status": "fixed", "lang": None}
+    start = time.perf_counter()
+    partial = dst.with_name(dst.name + ".part")
+    epub = None
+    try:
+        key = content_key(src) if cache else None
+        hit = cache.get(key) if cache else None
+        if hit:
+            shutil.copyfile(hit.path, partial)
+            record.update(status="cached", lang=hit.lang)
+        else:
+            epub = Epub(src, clone_path=partial)
+            for event in ace_fix_mec(epub):
+                record["lang"] = event.lang or record["lang"]
+            epub.close()
+            if cache:
+                cache.put(key, partial, record["lang"])
+        os.replace(partial, dst)
+    except Exception as e:
+        log.error(f"Failed to fix {src}: {e}")
+        if epub:
+            epub.close()
+        partial.unlink(missing_ok=True)
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run_batch(inputs, output_dir=None, jobs=None, force=False, cache=None):
+    # type: (list[Path], Path|None, int|None, bool, ResultCache|None) -> Iterator[dict]
+    """Fix all inputs with a pool of worker processes and yield records as books finish.
+
+    :param inputs: EPUB files to fix.
+    :param output_dir: Directory for the fixed EPUBs (defaults to next to each input).
+    :param jobs: Number of worker processes (defaults to the number of CPUs).
+    :param force: Fix inputs even if their output is up to date.
+    :param cache: Optional result cache shared by all workers.
+    :return: One summary record per input, in order of completion.
+    """
+    futures = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for src in inputs:
+            dst = output_path(src, output_dir)
+            if not force and is_up_to_date(src, dst):
+                yield {"input": str(src), "output": str(dst), "status": "skipped"}
+                continue
+            futures[pool.submit(fix_book, src, dst, cache)] = (src, dst)
+        for future in as_completed(futures):
+            src, dst = futures[future]
+            try:
+                yield future.result()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                yield {"input": str(src), "output": str(dst), "status": "error", "error": error}
+
+
+def parse_args(argv=None):
+    # type: (list[str]|None) -> argparse.Namespace
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(prog="accfix", description=__doc__)
+    parser.add_argument("inputs", nargs="+", help="EPUB files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", type=Path, help="directory for fixed EPUBs")
+    parser.add_argument("-j", "--jobs", type=int, help="number of worker processes")
+    parser.add_argument("-f", "--force", action="store_true", help="refix up to date outputs")
+    parser.add_argument("-s", "--summary", type=Path, help="append JSONL summary to this file")
+    parser.add_argument("-c", "--cache", action="store_true", help="use the result cache")
+    parser.add_argument("--log-level", default="WARNING", help="loguru log level")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    # type: (list[str]|None) -> int
+    """Run the batch fixer and return the process exit code."""
+    args = parse_args(argv)
+    log.remove()
+    log.add(sys.stderr, level=args.log_level.upper())
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        log.error("No EPUB files found")
+        return 2
+    if args.output_dir:
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+    cache = ResultCache() if args.cache else None
+    summary = args.summary.open("a", encoding="utf-8") if args.summary else sys.stdout
+    failed = False
+    try:
+        # Every record is flushed as its book finishes, so an interrupted batch keeps its summary
+        for record in run_batch(inputs, args.output_dir, args.jobs, args.force, cache):
+            summary.write(json.dumps(record) + "\n")
+            summary.flush()
+            failed = failed or record["status"] == "error"
+    finally:
+        if summary is not sys.stdout:
+            summary.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,53 +1,136 @@
 """Module for handling EPUB files"""
 
+import copy
+from contextlib import contextmanager
 from functools import cache
-from typing import List, Optional
+from io import BytesIO
+from typing import BinaryIO, Generator, Iterator, List, Optional
 from loguru import logger as log
 from pathlib import Path
+import os
 import shutil
 import tempfile
-from accfix.zfile import ZipFileR
+import time
+from zipfile import ZipInfo
+from accfix.opf import Package
+from accfix.zfile import ZipFileR, copy_raw, sync_dir
 from lxml import etree
 from lxml.etree import ElementTree
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+FICLONE = 0x40049409  # Linux ioctl to share file extents (btrfs, xfs, ...)
+
 
 class Epub:
     def __init__(self, path, clone=True, clone_path=None):
-        # type: (str|Path, bool, str|Path|None) -> None
+        # type: (str|Path|bytes|memoryview|BinaryIO, bool, str|Path|None) -> None
         """EPUB file object for reading and writing members.
 
-        :param path: Path to the EPUB file.
+        :param path: Path to the EPUB file, or its content as bytes-like or binary file object
+            (e.g. BytesIO) to work fully in memory.
         :param clone: Create a (temporary) copy of the EPUB file and open that one.
+            The copy is deferred until the first write and uses a reflink where supported.
+            Read-only use never creates a temporary directory.
         :param clone_path: Custom file path for the cloned EPUB file.
         """
+        self._clone = Path(clone_path) if clone and clone_path else None
+        self._temp_clone = clone and not clone_path  # Temporary directory is created on first write
+        self._cloned = False
+        self._pending = None  # type: dict[str, bytes]|None
+        self._package = None  # type: Package|None
+        self._buffer = None  # type: BytesIO|None
+        self._exports = []  # type: list[BinaryIO]
+        if not isinstance(path, (str, Path)):
+            self._path = None
+            self.name = Path(getattr(path, "name", None) or "memory.epub").name
+            log.debug(f"Opening in-memory EPUB: {self.name}")
+            self._buffer = memory_buffer(path, clone)
+            self._temp_clone = False
+            self._zf = ZipFileR(self._buffer, mode="r")  # Reopened for writing by `materialize`
+            return
         self._path = Path(path)
         self.name = self._path.name
         log.debug("Opening EPUB file: {name}".format(name=self._path.name))
-        self._clone = None
-        if clone:
-            if clone_path:
-                self._clone = Path(clone_path)
-            else:
-                temp_dir = tempfile.mkdtemp()
-                self._clone = Path(temp_dir) / self._path.name
-            shutil.copy2(self._path, self._clone)
-            log.debug(f"Cloning EPUB file to: {self._clone}")
-        self._zf = ZipFileR(self.path, mode="a")
+        self._zf = ZipFileR(self._path, mode="r" if clone else "a")
 
     def __del__(self):
         self.close()
 
     def close(self):
+        if getattr(self, "_pending", None):
+            log.warning(f"Discarding {len(self._pending)} uncommitted writes to {self.name}")
+            self._pending = None
         if hasattr(self, "_zf") and self._zf is not None:
             self._zf.close()
             self._zf = None
+        for handle in getattr(self, "_exports", ()):
+            handle.close()
+        if getattr(self, "_temp_clone", False) and self._clone and not self._cloned:
+            shutil.rmtree(self._clone.parent, ignore_errors=True)  # Failed before the first write
+            self._clone = None
 
     def __repr__(self):
-        return f'Epub("{self._path.name}")'
+        return f'Epub("{self.name}")'
 
     @property
-    def path(self) -> Path:
-        return self._clone or self._path
+    def path(self) -> Optional[Path]:
+        return self._clone if self._cloned else self._path
+
+    def getbuffer(self):
+        # type: () -> memoryview
+        """Commit and close an in-memory EPUB and return a view of the finished archive."""
+        if self._buffer is None:
+            raise ValueError("getbuffer() requires an in-memory EPUB")
+        self.commit()
+        self.close()
+        return self._buffer.getbuffer()
+
+    def export(self):
+        # type: () -> BinaryIO
+        """Finalize the archive and return a binary file handle to read it from the start.
+
+        Pending writes are committed and the archive is closed for further reads and writes.
+        The handle is closed by `close`.
+        """
+        self.commit()
+        if self._zf is not None:
+            self._zf.close()
+            self._zf = None
+        if self._buffer is not None:
+            self._buffer.seek(0)
+            return self._buffer
+        handle = open(self.path, "rb")
+        self._exports.append(handle)
+        return handle
+
+    def iter_chunks(self, chunk_size=2**20):
+        # type: (int) -> Iterator[bytes]
+        """Finalize the archive and yield its content in chunks."""
+        handle = self.export()
+        while chunk := handle.read(chunk_size):
+            yield chunk
+
+    def materialize(self):
+        # type: () -> None
+        """Create the clone (if not done yet) and reopen it for writing.
+
+        In-memory EPUBs are opened read-only until their first write.
+        """
+        if self._buffer is not None and self._zf.mode == "r":
+            self._zf.close()
+            self._zf = ZipFileR(self._buffer, mode="a")
+            return
+        if self._cloned or self._clone_target() is None:
+            return
+        method = clone_file(self._path, self._clone)
+        log.debug(f"Cloning EPUB file to: {self._clone} ({method})")
+        self._zf.close()
+        self._cloned = True
+        self._zf = ZipFileR(self._clone, mode="a")
 
     @cache
     def opf_path(self) -> Path:
@@ -60,39 +143,26 @@ class Epub:
         result = rootfile_element.attrib["full-path"]
         return Path(result)
 
+    def package(self):
+        # type: () -> Package
+        """Return the parsed OPF model, built once and rebuilt after the OPF is written."""
+        if self._package is None:
+            self._package = Package(self.opf_path(), self.read(self.opf_path()))
+        return self._package
+
     def opf_tree(self) -> ElementTree:
         """Return parsed ElementTree of OPF-File"""
-        return etree.ElementTree(etree.fromstring(self.read(self.opf_path())))
+        return etree.ElementTree(copy.deepcopy(self.package().root))
 
     def nav_path(self) -> Optional[Path]:
         """Determine nav-File path within epub archive"""
-        opf_content = self.read(self.opf_path())
-        tree = etree.fromstring(opf_content)
-
-        # Define namespaces
-        namespaces = {
-            "opf": "http://www.idpf.org/2007/opf",
-        }
-
-        # Find the item with properties="nav"
-        nav_item = tree.xpath("//opf:manifest/opf:item[@properties='nav']", namespaces=namespaces)
-
-        if not nav_item:
+        navs = self.package().navs
+        if not navs:
             log.warning("No nav item found in the EPUB manifest")
             return None
-
-        if len(nav_item) > 1:
+        if len(navs) > 1:
             log.warning("Multiple nav items found in the EPUB manifest. Using the first one.")
-
-        # Get the href of the nav item
-        nav_href = nav_item[0].get("href")
-
-        # Combine the OPF directory with the href to get the full relative path
-        opf_dir = self.opf_path().parent
-        full_path = opf_dir / nav_href
-
-        # Normalize the path to remove any '..' components
-        return Path(full_path.as_posix())
+        return navs[0].path
 
     def nav_tree(self) -> ElementTree:
         """Return parsed ElementTree of OPF-File"""
@@ -107,6 +177,8 @@ class Epub:
         """
         path = Path(path)
         log.trace(f"Reading: {self.name}/{path.as_posix()}")
+        if self._pending is not None and path.as_posix() in self._pending:
+            return self._pending[path.as_posix()]
         with self._zf.open(path.as_posix()) as file:
             return file.read()
 
@@ -119,12 +191,114 @@ class Epub:
         """
         path = Path(path)
         log.trace(f"Writing: {self.name}/{path}")
+        if path == self.opf_path():
+            self._package = None
+        if self._pending is not None:
+            self._pending[path.as_posix()] = data
+            return
+        self.materialize()
+        zinfo = self._zf.NameToInfo.get(path.as_posix())
+        self._zf.replace(replacement_info(zinfo) if zinfo else path.as_posix(), data)
+
+    @contextmanager
+    def transaction(self):
+        # type: () -> Generator[Epub, None, None]
+        """Buffer writes and rebuild the archive once when the block exits.
+
+        Buffered writes are discarded if the block raises. Nested transactions join the outer one.
+        """
+        if self._pending is not None:
+            yield self
+            return
+        self.begin()
         try:
-            self._zf.remove(path.as_posix())
-        except KeyError:
-            pass
-        with self._zf.open(path.as_posix(), "w") as file:
-            file.write(data)
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    def begin(self):
+        # type: () -> None
+        """Start buffering writes in memory until `commit` or `rollback`."""
+        if self._pending is None:
+            self._pending = {}
+
+    def rollback(self):
+        # type: () -> None
+        """Discard all buffered writes."""
+        if self._pending and self.opf_path().as_posix() in self._pending:
+            self._package = None
+        self._pending = None
+
+    def commit(self):
+        # type: () -> None
+        """Write buffered changes in a single sequential pass and atomically swap the archive.
+
+        Unchanged members are copied with their compressed bytes as-is. A deferred clone is
+        written directly by this pass without copying the source first.
+        """
+        pending = self._pending
+        if not pending:
+            self._pending = None
+            return
+        log.debug(f"Committing {len(pending)} members to {self.name}")
+        if self._buffer is not None:
+            buffer = BytesIO()
+            self.rebuild(buffer, pending)
+            self._zf.close()
+            # Write back in place, a BytesIO passed with clone=False holds the result
+            self._buffer.seek(0)
+            self._buffer.write(buffer.getbuffer())
+            self._buffer.truncate()
+            self._zf = ZipFileR(self._buffer, mode="a")
+            self._pending = None
+            return
+        target = self._clone_target() or self._path
+        fd, tmp_name = tempfile.mkstemp(suffix=".tmp", dir=target.parent)
+        os.close(fd)
+        tmp_path = Path(tmp_name)
+        try:
+            shutil.copymode(self._path, tmp_path)  # mkstemp creates the file with mode 0600
+            with open(tmp_path, "wb") as tmp:
+                self.rebuild(tmp, pending)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        self._zf.close()
+        os.replace(tmp_path, target)
+        sync_dir(target.parent)
+        self._cloned = self._clone is not None
+        self._zf = ZipFileR(target, mode="a")
+        self._pending = None
+
+    def _clone_target(self):
+        # type: () -> Path|None
+        """Return the clone path, creating the temporary directory for it on first use."""
+        if self._clone is None and self._temp_clone:
+            self._clone = Path(tempfile.mkdtemp()) / self._path.name
+        return self._clone
+
+    def rebuild(self, file, changes):
+        # type: (str|Path|BinaryIO, dict[str, bytes]) -> None
+        """Write a new archive with all current members, replacing or adding `changes`.
+
+        :param file: Path or binary file object to write the new archive to.
+        :param changes: New member contents by archive path.
+        """
+        with ZipFileR(file, mode="w") as dst:
+            for zinfo in self._zf.infolist():
+                if self._zf.NameToInfo.get(zinfo.filename) is not zinfo:
+                    continue
+                if zinfo.filename in changes:
+                    dst.writestr(replacement_info(zinfo), changes[zinfo.filename])
+                else:
+                    copy_raw(self._zf, dst, zinfo)
+            for name, data in changes.items():
+                if name not in dst.NameToInfo:
+                    dst.writestr(name, data)
 
     def pages(self):
         # type: () -> List[Path]
@@ -132,38 +306,48 @@ class Epub:
 
         Reads all <spine> elements and resolves them to the actual file paths.
         """
-        opf_content = self.read(self.opf_path())
-        tree = etree.fromstring(opf_content)
-
-        # Define namespaces
-        namespaces = {
-            "opf": "http://www.idpf.org/2007/opf",
-            "dc": "http://purl.org/dc/elements/1.1/",
-        }
-
-        # Get the spine elements
-        spine_elements = tree.xpath("//opf:spine/opf:itemref", namespaces=namespaces)
-
-        # Get the manifest elements
-        manifest_elements = tree.xpath("//opf:manifest/opf:item", namespaces=namespaces)
-
-        # Create a dictionary to map ids to hrefs
-        id_to_href = {item.get("id"): item.get("href") for item in manifest_elements}
-
-        # Get the paths for each spine item
-        page_paths = []
-        opf_dir = self.opf_path().parent
-        for itemref in spine_elements:
-            idref = itemref.get("idref")
-            if idref in id_to_href:
-                href = id_to_href[idref]
-                # Combine the OPF directory with the href to get the full relative path
-                full_path = opf_dir / href
-                # Normalize the path to remove any '..' components
-                full_path = Path(full_path.as_posix())
-                page_paths.append(full_path)
-
-        return page_paths
+        return list(self.package().spine)
+
+
+def memory_buffer(source, clone=True):
+    # type: (bytes|memoryview|BinaryIO, bool) -> BytesIO
+    """Return a BytesIO with the archive content of a bytes-like or file object.
+
+    A BytesIO source is used directly unless clone is set, it then receives all writes.
+    """
+    if isinstance(source, BytesIO):
+        return BytesIO(source.getvalue()) if clone else source
+    if hasattr(source, "read"):
+        source.seek(0)
+        return BytesIO(source.read())
+    return BytesIO(source)
+
+
+def clone_file(src, dst):
+    # type: (Path, Path) -> str
+    """Copy src to dst as a reflink (copy-on-write) if supported, else as a full copy.
+
+    :return: The method used ("reflink" or "copy").
+    """
+    if fcntl is not None:
+        try:
+            with open(src, "rb") as infile, open(dst, "wb") as outfile:
+                fcntl.ioctl(outfile.fileno(), FICLONE, infile.fileno())
+            shutil.copystat(src, dst)
+            return "reflink"
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def replacement_info(zinfo):
+    # type: (ZipInfo) -> ZipInfo
+    """Create a fresh ZipInfo for new content of an existing member keeping its compression."""
+    info = ZipInfo(zinfo.filename, date_time=time.localtime(time.time())[:6])
+    info.compress_type = zinfo.compress_type
+    info.external_attr = zinfo.external_attr
+    return info
 
 
 if __name__ == "__main__":
@@ -2,6 +2,7 @@ import os
 import shutil
 import zipfile
 from lxml import etree
+from accfix.zfile import copy_raw
 
 
 def copy_epub(file_path: str) -> str:
@@ -78,7 +79,7 @@ def update_epub(new_file_path: str, opf_path: str, new_opf_content: bytes) -> No
                 if item.filename == opf_path:
                     zip_write.writestr(opf_path, new_opf_content)
                 else:
-                    zip_write.writestr(item, zip_read.read(item.filename))
+                    copy_raw(zip_read, zip_write, item)
 
     os.replace(temp_zip_path, new_file_path)
 
@@ -131,7 +132,7 @@ def fix_attributes(new_file_path: str) -> None:
                         )
                         zip_write.writestr(item.filename, new_xhtml_content)
                 else:
-                    zip_write.writestr(item, zip_read.read(item.filename))
+                    copy_raw(zip_read, zip_write, item)
 
     os.replace(temp_zip_path, new_file_path)
 
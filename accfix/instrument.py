@@ -0,0 +1,135 @@
+"""Structured progress events, per-stage timing and optional profiling of the fixer"""
+
+import cProfile
+import io
+import os
+import pstats
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Generator, TypeVar
+from loguru import logger as log
+
+PROFILE_ENV = "ACCFIX_PROFILE"
+# Share of the overall progress of each fixing stage (in order)
+STAGE_WEIGHTS = {"language": 0.05, "opf": 0.02, "nav": 0.02, "pages": 0.81, "write": 0.1}
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Progress:
+    """Progress event of a fixing run"""
+
+    stage: str
+    message: str
+    index: int = 0
+    total: int = 0
+    lang: str | None = None  # Detected language, set on the "language" event
+
+    def __str__(self):
+        return self.message
+
+    @property
+    def fraction(self):
+        # type: () -> float
+        """Overall progress of the run between 0.0 and 1.0."""
+        if self.stage not in STAGE_WEIGHTS:
+            return 1.0
+        done = 0.0
+        for stage, weight in STAGE_WEIGHTS.items():
+            if stage == self.stage:
+                return done + weight * (self.index / self.total if self.total else 0.0)
+            done += weight
+        return done
+
+
+@dataclass
+class StageStats:
+    """Accumulated time and bytes of a stage"""
+
+    seconds: float = 0.0
+    bytes: int = 0
+    calls: int = 0
+
+
+class Timings:
+    def __init__(self):
+        # type: () -> None
+        """Per-stage timing and byte counts (e.g. read, parse, transform, serialize, write)."""
+        self.stages = defaultdict(StageStats)  # type: dict[str, StageStats]
+
+    def __repr__(self):
+        return f"Timings({', '.join(self.stages)})"
+
+    def add(self, stage, seconds, nbytes=0):
+        # type: (str, float, int) -> None
+        """Record one measurement of a stage."""
+        stats = self.stages[stage]
+        stats.seconds += seconds
+        stats.bytes += nbytes
+        stats.calls += 1
+
+    @contextmanager
+    def measure(self, stage, nbytes=0):
+        # type: (str, int) -> Generator[None, None, None]
+        """Time the enclosed block as one call of stage."""
+        start = time.perf_counter()
+        yield
+        self.add(stage, time.perf_counter() - start, nbytes)
+
+    def merge(self, other):
+        # type: (Timings) -> Timings
+        """Add the measurements of other (e.g. from a worker process)."""
+        for stage, stats in other.stages.items():
+            mine = self.stages[stage]
+            mine.seconds += stats.seconds
+            mine.bytes += stats.bytes
+            mine.calls += stats.calls
+        return self
+
+    def report(self):
+        # type: () -> str
+        """Format the timings as a one-line summary."""
+        parts = [
+            f"{stage}={stats.seconds:.3f}s/{stats.bytes / 2**20:.1f}MiB"
+            for stage, stats in self.stages.items()
+        ]
+        return f"Timings: {', '.join(parts)}"
+
+
+def profiled(steps, target=None):
+    # type: (Generator[T, None, T], str|None) -> Generator[T, None, T]
+    """Run a generator under cProfile, excluding the time spent by its consumer.
+
+    :param steps: Generator to profile.
+    :param target: File for the pstats dump, "1" to log the top functions instead
+        (defaults to $ACCFIX_PROFILE).
+    """
+    target = target or os.environ.get(PROFILE_ENV)
+    profiler = cProfile.Profile()
+    try:
+        while True:
+            profiler.enable()
+            try:
+                item = next(steps)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                profiler.disable()
+            yield item
+    finally:
+        write_profile(profiler, target)
+
+
+def write_profile(profiler, target):
+    # type: (cProfile.Profile, str) -> None
+    """Dump profile stats to the target file or log the top functions if target is "1"."""
+    if target == "1":
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(25)
+        log.info(f"Profile of fixing run:\n{stream.getvalue()}")
+    else:
+        profiler.dump_stats(target)
+        log.info(f"Profile written to {target}")
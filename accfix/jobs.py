@@ -0,0 +1,297 @@
+"""SQLite-backed job queue that runs EPUB fixes in a bounded pool of worker processes"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from loguru import logger as log
+from accfix.ace_fix import ace_fix_mec
+from accfix.cache import ResultCache
+from accfix.epub import Epub
+
+JOBS_DIR_ENV = "ACCFIX_JOBS_DIR"
+DB_NAME = "jobs.sqlite"
+INPUT_NAME = "input.epub"
+OUTPUT_NAME = "fixed.epub"
+MAX_AGE = 24 * 3600  # Seconds to keep finished jobs and their artifacts
+HEARTBEAT = 5.0  # Seconds between lease renewals of the jobs owned by a queue
+LEASE = 30.0  # Seconds without renewal after which the jobs of a queue are taken over
+FINISHED = ("done", "error")
+WORKER_DIED = "BrokenProcessPool: The worker process died (e.g. out of memory)"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    cache_key TEXT,
+    status TEXT NOT NULL,
+    fraction REAL NOT NULL DEFAULT 0,
+    lang TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    owner TEXT,
+    heartbeat REAL
+);
+CREATE TABLE IF NOT EXISTS events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    message TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+@dataclass
+class Job:
+    """State of a queued fix"""
+
+    id: str
+    name: str
+    status: str  # queued, running, done or error
+    fraction: float
+    lang: str | None
+    error: str | None
+
+    @property
+    def finished(self):
+        # type: () -> bool
+        """Check if the job is done or failed."""
+        return self.status in FINISHED
+
+
+def connect(root):
+    # type: (Path) -> sqlite3.Connection
+    """Open the job database of root (safe for concurrent use by several processes)."""
+    db = sqlite3.connect(root / DB_NAME, timeout=30, isolation_level=None, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    columns = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+    for column in ("owner TEXT", "heartbeat REAL"):  # Databases of older versions
+        if column.split()[0] not in columns:
+            db.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+    return db
+
+
+def run_job(root, job_id):
+    # type: (Path, str) -> None
+    """Fix the input EPUB of a job in a worker process and record its progress."""
+    db = connect(root)
+    job_dir = root / job_id
+    name, cache_key = db.execute(
+        "SELECT name, cache_key FROM jobs WHERE id = ?", (job_id,)
+    ).fetchone()
+    db.execute(
+        "UPDATE jobs SET status = 'running', updated = ? WHERE id = ?", (time.time(), job_id)
+    )
+    epub = None
+    try:
+        epub = Epub(job_dir / INPUT_NAME, clone_path=job_dir / OUTPUT_NAME)
+        lang = None
+        for seq, event in enumerate(ace_fix_mec(epub)):
+            lang = event.lang or lang
+            db.execute(
+                "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?)",
+                (job_id, seq, event.stage, event.message),
+            )
+            db.execute(
+                "UPDATE jobs SET fraction = ?, lang = ?, updated = ? WHERE id = ?",
+                (event.fraction, lang, time.time(), job_id),
+            )
+        epub.close()
+        if cache_key:
+            ResultCache().put(cache_key, job_dir / OUTPUT_NAME, lang)
+        db.execute(
+            "UPDATE jobs SET status = 'done', fraction = 1, updated = ? WHERE id = ?",
+            (time.time(), job_id),
+        )
+    except Exception as e:
+        log.error(f"Job {job_id} ({name}) failed: {e}")
+        if epub:
+            epub.close()
+        db.execute(
+            "UPDATE jobs SET status = 'error', error = ?, updated = ? WHERE id = ?",
+            (f"{type(e).__name__}: {e}", time.time(), job_id),
+        )
+    finally:
+        db.close()
+
+
+class JobQueue:
+    def __init__(self, root=None, workers=2):
+        # type: (str|Path|None, int) -> None
+        """Persistent queue of EPUB fixes served by a bounded process pool.
+
+        Each queue holds a lease on its jobs that it renews every `HEARTBEAT` seconds. Jobs
+        whose lease expired (their queue is gone) are taken over and resubmitted. A pool broken
+        by a dying worker is replaced, the jobs it was running fail.
+
+        :param root: Directory for the job database and artifacts
+            (defaults to $ACCFIX_JOBS_DIR or a directory in the system temp dir).
+        :param workers: Maximum number of concurrent fixes.
+        """
+        root = root or os.environ.get(JOBS_DIR_ENV) or Path(tempfile.gettempdir()) / "accfix-jobs"
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db = connect(self.root)
+        self.lock = threading.Lock()
+        self.workers = workers
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.pool_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.beat()
+        self.heartbeat = threading.Thread(target=self.keep_alive, name="jobs", daemon=True)
+        self.heartbeat.start()
+
+    def __repr__(self):
+        return f'JobQueue("{self.root}")'
+
+    def query(self, sql, params=()):
+        # type: (str, tuple) -> list[tuple]
+        """Run a statement on the shared connection (from any session thread)."""
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()
+
+    def submit(self, data, name, cache_key=None):
+        # type: (bytes|memoryview, str, str|None) -> str
+        """Queue a fix of an EPUB given as bytes and return the job id.
+
+        :param data: Content of the uploaded EPUB.
+        :param name: Original file name.
+        :param cache_key: Key to store the result in the `ResultCache` under.
+        """
+        self.prune()
+        job_id = uuid.uuid4().hex
+        job_dir = self.root / job_id
+        job_dir.mkdir()
+        (job_dir / INPUT_NAME).write_bytes(data)
+        now = time.time()
+        self.query(
+            "INSERT INTO jobs (id, name, cache_key, status, created, updated, owner, heartbeat) "
+            "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+            (job_id, name, cache_key, now, now, self.owner, now),
+        )
+        self.dispatch(job_id)
+        log.info(f"Queued job {job_id} for {name}")
+        return job_id
+
+    def dispatch(self, job_id):
+        # type: (str) -> None
+        """Run a job in the worker pool, replacing the pool if a worker died."""
+        with self.pool_lock:
+            try:
+                future = self.pool.submit(run_job, self.root, job_id)
+            except BrokenProcessPool:
+                log.warning("Worker pool is broken, starting a new one")
+                self.pool.shutdown(wait=False)
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+                future = self.pool.submit(run_job, self.root, job_id)
+        future.add_done_callback(partial(self.on_done, job_id))
+
+    def on_done(self, job_id, future):
+        # type: (str, Future) -> None
+        """Handle a job whose worker failed (`run_job` itself records all errors)."""
+        if future.cancelled() or future.exception() is None:
+            return
+        job = self.get(job_id)
+        if job is not None and job.status == "queued":  # Never started, the pool broke before
+            self.dispatch(job_id)
+            return
+        log.error(f"Job {job_id} failed: {future.exception()!r}")
+        self.query(
+            "UPDATE jobs SET status = 'error', error = ?, updated = ? "
+            "WHERE id = ? AND status NOT IN (?, ?)",
+            (WORKER_DIED, time.time(), job_id, *FINISHED),
+        )
+
+    def beat(self):
+        # type: () -> None
+        """Renew the lease on the own jobs and take over jobs of queues that are gone."""
+        now = time.time()
+        self.query(
+            "UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status IN ('queued', 'running')",
+            (now, self.owner),
+        )
+        orphans = self.query(
+            "UPDATE jobs SET owner = ?, heartbeat = ?, status = 'queued' "
+            "WHERE status IN ('queued', 'running') AND (heartbeat IS NULL OR heartbeat < ?) "
+            "RETURNING id",
+            (self.owner, now, now - LEASE),
+        )
+        for (job_id,) in orphans:
+            log.info(f"Resubmitting interrupted job {job_id}")
+            self.query("DELETE FROM events WHERE job_id = ?", (job_id,))
+            self.dispatch(job_id)
+
+    def keep_alive(self):
+        # type: () -> None
+        """Renew leases until the queue is closed (runs in a daemon thread)."""
+        while not self.stopped.wait(HEARTBEAT):
+            try:
+                self.beat()
+            except Exception:
+                log.exception("Job queue heartbeat failed")
+
+    def get(self, job_id):
+        # type: (str) -> Job|None
+        """Return the current state of a job."""
+        rows = self.query(
+            "SELECT id, name, status, fraction, lang, error FROM jobs WHERE id = ?", (job_id,)
+        )
+        return Job(*rows[0]) if rows else None
+
+    def events(self, job_id, after=-1):
+        # type: (str, int) -> list[tuple[int, str, str]]
+        """Return the (seq, stage, message) progress events of a job after seq."""
+        return self.query(
+            "SELECT seq, stage, message FROM events WHERE job_id = ? AND seq > ? ORDER BY seq",
+            (job_id, after),
+        )
+
+    def source(self, job_id):
+        # type: (str) -> Path
+        """Return the input EPUB of a job."""
+        return self.root / job_id / INPUT_NAME
+
+    def artifact(self, job_id):
+        # type: (str) -> Path|None
+        """Return the fixed EPUB of a finished job."""
+        job = self.get(job_id)
+        if job is None or job.status != "done":
+            return None
+        return self.root / job_id / OUTPUT_NAME
+
+    def prune(self, max_age=MAX_AGE):
+        # type: (float) -> int
+        """Delete finished jobs and their artifacts older than max_age seconds.
+
+        :return: Number of deleted jobs.
+        """
+        rows = self.query(
+            "SELECT id FROM jobs WHERE status IN (?, ?) AND updated < ?",
+            (*FINISHED, time.time() - max_age),
+        )
+        for (job_id,) in rows:
+            shutil.rmtree(self.root / job_id, ignore_errors=True)
+            self.query("DELETE FROM events WHERE job_id = ?", (job_id,))
+            self.query("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return len(rows)
+
+    def close(self):
+        # type: () -> None
+        """Wait for running jobs and release the pool and database."""
+        self.pool.shutdown()
+        self.stopped.set()
+        self.heartbeat.join()
+        self.db.close()
@@ -1,46 +1,141 @@
+import os
+from functools import cache
+from pathlib import Path
 from loguru import logger as log
 from typing import Optional
-from lingua import LanguageDetectorBuilder
+from lingua import IsoCode639_1, LanguageDetector, LanguageDetectorBuilder
 from accfix.epub import Epub
+from accfix.text import xml_text
 from lxml import etree
 
-detector = LanguageDetectorBuilder.from_all_languages().with_low_accuracy_mode().build()
+LANGUAGES_ENV = "ACCFIX_LANGUAGES"
 
 
-def detect_lang(text: str) -> Optional[str]:
-    """Detect language of text and return ISO 639-1 code"""
+@cache
+def get_detector(languages=None):
+    # type: (tuple[str, ...]|None) -> LanguageDetector
+    """Build a low accuracy detector once per candidate set and share it process-wide.
+
+    :param languages: Sorted ISO 639-1 codes of candidate languages (None for all languages).
+    """
+    if languages:
+        log.debug(f"Building language detector for: {', '.join(languages)}")
+        codes = [IsoCode639_1.from_str(code) for code in languages]
+        builder = LanguageDetectorBuilder.from_iso_codes_639_1(*codes)
+    else:
+        log.debug("Building language detector for all languages")
+        builder = LanguageDetectorBuilder.from_all_languages()
+    return builder.with_low_accuracy_mode().build()
+
+
+def candidate_languages(hints=()):
+    # type: (list[str]|tuple[str, ...]) -> tuple[str, ...]|None
+    """Return candidate ISO 639-1 codes configured via env var, extended by metadata hints.
+
+    Returns None (all languages) if no candidates are configured.
+
+    :param hints: Language tags declared by the publication (e.g. dc:language "en-US").
+    """
+    configured = os.environ.get(LANGUAGES_ENV, "")
+    codes = {code.strip().lower() for code in configured.split(",") if code.strip()}
+    if not codes:
+        return None
+    codes.update(tag.split("-")[0].lower() for tag in hints)
+    return tuple(sorted(code for code in codes if is_iso_code(code)))
+
+
+def is_iso_code(code):
+    # type: (str) -> bool
+    """Check if code is an ISO 639-1 code supported by lingua."""
+    try:
+        IsoCode639_1.from_str(code)
+    except ValueError:
+        log.warning(f"Ignoring unsupported language code: {code}")
+        return False
+    return True
+
+
+def detect_lang(text, languages=None):
+    # type: (str, tuple[str, ...]|None) -> Optional[str]
+    """Detect language of text and return ISO 639-1 code
+
+    :param text: Text to detect the language of.
+    :param languages: Candidate ISO 639-1 codes (defaults to the configured candidates).
+    """
+    detector = get_detector(languages or candidate_languages())
     detected_language = detector.detect_language_of(text)
     if not detected_language:
         return
     return detected_language.iso_code_639_1.name.lower()
 
 
-def xml_text(xml: etree._Element) -> str:
-    """Extract plaintext content from XML tree"""
-    content = [t.strip() for t in xml.xpath("//text()") if t.strip()]
-    return "\n".join(content)
+def sample_pages(pages, samples):
+    # type: (list[Path], int) -> list[Path]
+    """Pick up to `samples` evenly spaced pages in spine order."""
+    if len(pages) <= samples:
+        return pages
+    step = len(pages) / samples
+    return [pages[int(step * (i + 0.5))] for i in range(samples)]
 
 
-def detect_epub_lang(epub: Epub, min_length=100) -> Optional[str]:
-    """Detect language of epub and return ISO 639-1 code"""
-    pages = epub.pages()
-    start_index = len(pages) // 2  # Start from the middle of the book
+def top_language(text, languages=None):
+    # type: (str, tuple[str, ...]|None) -> tuple[str, float]|None
+    """Return the most likely ISO 639-1 code of text with its confidence value."""
+    detector = get_detector(languages or candidate_languages())
+    confidences = detector.compute_language_confidence_values(text)
+    if not confidences or confidences[0].value == 0:
+        return None
+    best = confidences[0]
+    return best.language.iso_code_639_1.name.lower(), best.value
+
+
+def has_clear_lead(votes, lead):
+    # type: (dict[str, float], float) -> bool
+    """Check if the leading language is ahead of the runner-up by at least `lead`."""
+    ranked = sorted(votes.values(), reverse=True) + [0.0]
+    return ranked[0] - ranked[1] >= lead
+
 
-    for page in pages[start_index:] + pages[:start_index]:
+def epub_lang_distribution(epub, samples=9, min_length=100, lead=2.0):
+    # type: (Epub, int, int, float) -> dict[str, float]
+    """Detect languages on evenly spaced pages and return their share of the confidence votes.
+
+    Text of consecutive short pages is combined until it reaches `min_length`. Sampling stops
+    early once one language leads by `lead` summed confidence.
+
+    :param epub: The EPUB to analyze.
+    :param samples: Number of evenly spaced spine pages to sample.
+    :param min_length: Minimum number of characters per detection.
+    :param lead: Summed confidence lead after which sampling stops.
+    :return: Mapping of ISO 639-1 codes to their vote share, highest first.
+    """
+    languages = candidate_languages(epub.package().languages())
+    votes = {}  # type: dict[str, float]
+    text = ""
+    for page in sample_pages(epub.pages(), samples):
         try:
-            content = epub.read(page)
-            tree = etree.fromstring(content)
-            text = xml_text(tree)
-
-            if len(text) > min_length:
-                detected_lang = detect_lang(text)
-                if detected_lang:
-                    return detected_lang
+            text = f"{text}\n{xml_text(epub.read(page), budget=1000)}".strip()
+        except (KeyError, etree.XMLSyntaxError) as e:
+            log.warning(f"Error processing page {page}: {e}")
+            continue
+        if len(text) <= min_length:
             log.debug(f"Not enough text in {page}")
-        except Exception as e:
-            print(f"Error processing page {page}: {str(e)}")
+            continue
+        vote = top_language(text, languages)
+        text = ""
+        if vote:
+            votes[vote[0]] = votes.get(vote[0], 0.0) + vote[1]
+        if has_clear_lead(votes, lead):
+            break
+    total = sum(votes.values())
+    ranked = sorted(votes.items(), key=lambda item: item[1], reverse=True)
+    return {code: value / total for code, value in ranked}
+
 
-    return None
+def detect_epub_lang(epub: Epub, min_length=100) -> Optional[str]:
+    """Detect language of epub and return ISO 639-1 code"""
+    distribution = epub_lang_distribution(epub, min_length=min_length)
+    return next(iter(distribution), None)
 
 
 if __name__ == "__main__":
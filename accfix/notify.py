@@ -0,0 +1,174 @@
+"""Fire-and-forget Telegram notifications from a background event loop"""
+
+import asyncio
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from loguru import logger as log
+import telegram
+from telegram.error import NetworkError, RetryAfter, TelegramError
+from telegram.request import HTTPXRequest
+
+TOKEN_ENV = "TELEGRAM_BOT_TOKEN"
+CHAT_ENV = "TELEGRAM_CHAT_ID"
+MAX_TEXT = 4096  # Telegram message length limit
+MAX_DOCUMENT = 50 * 2**20  # Telegram bot upload limit
+BASE_URL = "https://api.telegram.org/bot"
+
+
+@dataclass
+class Notification:
+    """Queued message with an optional document attachment"""
+
+    text: str
+    document: bytes | None = None
+    filename: str | None = None
+
+
+class Notifier:
+    maxsize = 100  # Queued notifications, further ones are dropped
+    retries = 5  # Delivery attempts on network errors or rate limits
+    backoff = 1.0  # Seconds before the first retry on network errors, doubled per attempt
+
+    def __init__(self, token=None, chat_id=None, batch_window=2.0, base_url=BASE_URL):
+        # type: (str|None, str|None, float, str) -> None
+        """Deliver notifications from a persistent event loop in a daemon thread.
+
+        Text messages arriving within batch_window seconds are coalesced into one message.
+        Without token and chat id, notifications are only logged.
+
+        :param token: Bot token (defaults to $TELEGRAM_BOT_TOKEN).
+        :param chat_id: Target chat (defaults to $TELEGRAM_CHAT_ID).
+        :param batch_window: Seconds to wait for more messages before sending a batch.
+        :param base_url: Bot API endpoint (e.g. a local fake for tests).
+        """
+        self.token = token or os.environ.get(TOKEN_ENV)
+        self.chat_id = chat_id or os.environ.get(CHAT_ENV)
+        self.batch_window = batch_window
+        self.base_url = base_url
+        self.loop = asyncio.new_event_loop()
+        self.queue = asyncio.Queue(self.maxsize)  # type: asyncio.Queue[Notification|None]
+        self.thread = threading.Thread(target=self.run, name="notifier", daemon=True)
+        if self.token and self.chat_id:
+            self.thread.start()
+
+    def __repr__(self):
+        return f"Notifier(chat_id={self.chat_id})"
+
+    def notify(self, text, document=None, filename=None):
+        # type: (str, bytes|None, str|None) -> None
+        """Queue a notification without waiting for its delivery."""
+        if not self.thread.is_alive():
+            log.debug(f"Telegram notifications disabled: {text[:80]}")
+            return
+        if document is not None and len(document) > MAX_DOCUMENT:
+            log.warning(f"Not attaching {filename} ({len(document)} bytes) to notification")
+            document = None
+        notification = Notification(text, document, filename)
+        self.loop.call_soon_threadsafe(self.enqueue, notification)
+
+    def enqueue(self, notification):
+        # type: (Notification|None) -> None
+        """Add a notification to the queue (runs in the loop thread)."""
+        try:
+            self.queue.put_nowait(notification)
+        except asyncio.QueueFull:
+            log.warning(f"Notification queue full, dropping: {notification.text[:80]}")
+
+    def run(self):
+        # type: () -> None
+        """Run the event loop of the notifier thread."""
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.serve())
+        except Exception:
+            log.exception("Telegram notifier stopped")
+
+    async def serve(self):
+        # type: () -> None
+        """Deliver queued notifications with one pooled HTTP session until closed."""
+        request = HTTPXRequest(connection_pool_size=4)
+        bot = telegram.Bot(self.token, base_url=self.base_url, request=request)
+        async with bot:
+            while (batch := await self.next_batch()) is not None:
+                for notification in batch:
+                    await self.deliver(bot, notification)
+
+    async def next_batch(self):
+        # type: () -> list[Notification]|None
+        """Wait for notifications and coalesce the text messages of one batch window.
+
+        :return: Notifications to send or None if the notifier was closed.
+        """
+        first = await self.queue.get()
+        if first is None:
+            return None
+        items = [first]
+        deadline = self.loop.time() + self.batch_window
+        closed = False
+        while (timeout := deadline - self.loop.time()) > 0:
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except TimeoutError:
+                break
+            if item is None:
+                closed = True
+                break
+            items.append(item)
+        if closed:
+            self.queue.put_nowait(None)  # Stop after this batch
+        return coalesce(items)
+
+    async def deliver(self, bot, notification):
+        # type: (telegram.Bot, Notification) -> None
+        """Send a notification, retrying with exponential backoff on transient errors."""
+        for attempt in range(self.retries):
+            try:
+                if notification.document is not None:
+                    await bot.send_document(
+                        chat_id=self.chat_id,
+                        document=notification.document,
+                        filename=notification.filename,
+                        caption=notification.text[:1024],
+                    )
+                else:
+                    await bot.send_message(chat_id=self.chat_id, text=notification.text)
+                return
+            except RetryAfter as e:
+                delay = e.retry_after if isinstance(e.retry_after, (int, float)) else 1
+            except NetworkError:
+                delay = self.backoff * 2**attempt
+            except TelegramError as e:
+                log.error(f"Failed to send Telegram notification: {e}")
+                return
+            log.debug(f"Retrying Telegram notification in {delay}s")
+            await asyncio.sleep(delay)
+        log.error(f"Giving up Telegram notification after {self.retries} attempts")
+
+    def close(self, timeout=10.0):
+        # type: (float) -> None
+        """Deliver the queued notifications and stop the loop thread."""
+        if self.thread.is_alive():
+            asyncio.run_coroutine_threadsafe(self.queue.put(None), self.loop)
+            self.thread.join(timeout)
+
+
+def coalesce(items):
+    # type: (list[Notification]) -> list[Notification]
+    """Merge text messages into as few messages as possible, counting repeated ones.
+
+    Notifications with documents are kept as they are.
+    """
+    documents = [item for item in items if item.document is not None]
+    counts = Counter(item.text for item in items if item.document is None)
+    lines = [text if count == 1 else f"{text} ({count}x)" for text, count in counts.items()]
+    messages, current = [], ""
+    for line in lines:
+        if current and len(current) + len(line) + 2 > MAX_TEXT:
+            messages.append(Notification(current))
+            current = ""
+        current = f"{current}\n\n{line}" if current else line[:MAX_TEXT]
+    if current:
+        messages.append(Notification(current))
+    return messages + documents
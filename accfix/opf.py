@@ -0,0 +1,74 @@
+"""Parsed model of the EPUB package document (OPF)"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+from lxml import etree
+
+NS = {
+    "opf": "http://www.idpf.org/2007/opf",
+    "dc": "http://purl.org/dc/elements/1.1/",
+}
+
+
+@dataclass
+class ManifestItem:
+    """Manifest entry with its href resolved to a path within the archive"""
+
+    id: str
+    href: str
+    path: Path
+    media_type: str
+    properties: set[str] = field(default_factory=set)
+
+
+class Package:
+    def __init__(self, opf_path, data):
+        # type: (Path, bytes) -> None
+        """Parse an OPF document and index its manifest and spine.
+
+        :param opf_path: Path of the OPF-File within the archive.
+        :param data: Raw OPF-File content.
+        """
+        self.opf_path = opf_path
+        self.root = etree.fromstring(data)
+        self.manifest = manifest_items(self.root, opf_path.parent)  # type: dict[str, ManifestItem]
+        self.by_path = {item.path: item for item in self.manifest.values()}
+        self.spine = [
+            self.manifest[ref.get("idref")].path
+            for ref in self.root.iterfind("opf:spine/opf:itemref", namespaces=NS)
+            if ref.get("idref") in self.manifest
+        ]
+        self.navs = [item for item in self.manifest.values() if "nav" in item.properties]
+
+    @property
+    def nav(self) -> Optional[ManifestItem]:
+        return self.navs[0] if self.navs else None
+
+    def languages(self):
+        # type: () -> list[str]
+        """Return the dc:language values declared in the metadata."""
+        elements = self.root.iterfind("opf:metadata/dc:language", namespaces=NS)
+        return [el.text.strip() for el in elements if el.text and el.text.strip()]
+
+    def media_type(self, path):
+        # type: (str|Path) -> str|None
+        """Return the manifest media type of an archive member."""
+        item = self.by_path.get(Path(path))
+        return item.media_type if item else None
+
+
+def manifest_items(root, base):
+    # type: (etree._Element, Path) -> dict[str, ManifestItem]
+    """Index manifest items by id, resolving hrefs relative to the OPF directory."""
+    items = {}
+    for el in root.iterfind("opf:manifest/opf:item", namespaces=NS):
+        href = el.get("href")
+        items[el.get("id")] = ManifestItem(
+            id=el.get("id"),
+            href=href,
+            path=Path((base / href).as_posix()),
+            media_type=el.get("media-type"),
+            properties=set(el.get("properties", "").split()),
+        )
+    return items
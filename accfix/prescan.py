@@ -0,0 +1,79 @@
+"""Cheap detection of content pages that are already compliant"""
+
+import hashlib
+import json
+from pathlib import Path
+from loguru import logger as log
+
+INDEX_NAME = "pages.json"
+LINK_TITLE = b'title="Link area"'
+LINK_MARKERS = (b"trn_link", b"hotspot")
+
+
+def work_dir(path):
+    # type: (Path) -> Path
+    """Return the work directory of an EPUB file."""
+    return path.parent / f"{path.stem}_work"
+
+
+def needs_fix(data, lang):
+    # type: (bytes, str) -> bool
+    """Check on the raw bytes if a page may still need content page fixes.
+
+    A page is compliant if its root element has the right xml:lang and there are at least as
+    many link titles as trn_link and hotspot markers. The check errs on the side of fixing.
+    """
+    start = data.find(b"<html")
+    end = data.find(b">", start)
+    if start < 0 or end < 0 or f'xml:lang="{lang}"'.encode() not in data[start:end]:
+        return True
+    markers = sum(data.count(marker) for marker in LINK_MARKERS)
+    return data.count(LINK_TITLE) < markers
+
+
+class PageIndex:
+    def __init__(self, path, stamp):
+        # type: (Path|None, str) -> None
+        """Content hashes of pages known to be fixed, stored in the work directory of an EPUB.
+
+        :param path: EPUB file the index belongs to (None for in-memory EPUBs).
+        :param stamp: Fixer version and language the hashes are valid for.
+        """
+        self.file = work_dir(path) / INDEX_NAME if path else None
+        self.stamp = stamp
+        self.digests = {}  # type: dict[str, str]
+        try:
+            index = json.loads(self.file.read_text(encoding="utf-8"))
+        except (AttributeError, FileNotFoundError, ValueError):
+            return
+        if index.get("stamp") == stamp:
+            self.digests = index.get("pages", {})
+
+    def __repr__(self):
+        return f'PageIndex("{self.file}", pages={len(self.digests)})'
+
+    def known(self, page, data):
+        # type: (Path, bytes) -> bool
+        """Check if the page content is unchanged since it was recorded."""
+        return self.digests.get(page.as_posix()) == digest(data)
+
+    def record(self, page, data):
+        # type: (Path, bytes) -> None
+        """Record the fixed content of a page."""
+        self.digests[page.as_posix()] = digest(data)
+
+    def save(self):
+        # type: () -> None
+        """Write the index to the work directory."""
+        if self.file is None:
+            return
+        self.file.parent.mkdir(exist_ok=True)
+        index = {"stamp": self.stamp, "pages": self.digests}
+        self.file.write_text(json.dumps(index, indent=2), encoding="utf-8")
+        log.debug(f"Saved index of {len(self.digests)} fixed pages to {self.file}")
+
+
+def digest(data):
+    # type: (bytes) -> str
+    """Return the SHA-256 of page content."""
+    return hashlib.sha256(data).hexdigest()
@@ -0,0 +1,126 @@
+"""Streaming, indexed model of DAISY Ace reports"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+import ijson
+
+# Report metadata by ijson prefix (the title may be a single string or a list of strings)
+REPORT_FIELDS = {
+    "earl:testSubject.metadata.dc:title": "title",
+    "earl:testSubject.metadata.dc:title.item": "title",
+    "dct:date": "date",
+    "earl:result.earl:outcome": "outcome",
+}
+IMPACTS = ("critical", "serious", "moderate", "minor")
+
+
+@dataclass(frozen=True)
+class Violation:
+    """Failed check of an Ace report"""
+
+    document: str | None
+    rule: str
+    impact: str | None
+    description: str | None = None
+
+
+class AceReport:
+    def __init__(self, violations, outcome=None, title=None, date=None):
+        # type: (list[Violation], str|None, str|None, str|None) -> None
+        """Ace report reduced to its violations, indexed by rule, impact and document.
+
+        :param violations: Failed checks of the report.
+        :param outcome: Overall `earl:outcome` of the report ("pass" or "fail").
+        :param title: Title of the checked publication.
+        :param date: Date of the check.
+        """
+        self.violations = violations
+        self.outcome = outcome
+        self.title = title
+        self.date = date
+        self.by_rule = defaultdict(list)  # type: dict[str, list[Violation]]
+        self.by_impact = defaultdict(list)  # type: dict[str|None, list[Violation]]
+        self.by_document = defaultdict(list)  # type: dict[str|None, list[Violation]]
+        for violation in violations:
+            self.by_rule[violation.rule].append(violation)
+            self.by_impact[violation.impact].append(violation)
+            self.by_document[violation.document].append(violation)
+
+    def __repr__(self):
+        return f'AceReport("{self.title}", outcome={self.outcome}, violations={len(self)})'
+
+    def __len__(self):
+        return len(self.violations)
+
+    @classmethod
+    def load(cls, fp):
+        # type: (str|Path) -> AceReport
+        """Stream an Ace `report.json` file into a report model."""
+        with open(fp, "rb") as report_file:
+            return cls.parse(report_file)
+
+    @classmethod
+    def parse(cls, file):
+        # type: (BinaryIO) -> AceReport
+        """Parse an Ace report incrementally, keeping only violations and report metadata.
+
+        Outlines, extracted data and passed checks are skipped without being materialized.
+        """
+        fields, violations = {}, []
+        document = rule = impact = description = outcome = None
+        for prefix, event, value in ijson.parse(file):
+            if prefix in REPORT_FIELDS and event == "string":
+                fields.setdefault(REPORT_FIELDS[prefix], value)
+            elif prefix == "assertions.item.earl:testSubject.url":
+                document = value.split("#")[0] or None
+            elif prefix == "assertions.item.assertions.item" and event == "start_map":
+                rule = impact = description = outcome = None
+            elif prefix == "assertions.item.assertions.item.earl:test.dct:title":
+                rule = value
+            elif prefix == "assertions.item.assertions.item.earl:test.earl:impact":
+                impact = value
+            elif prefix == "assertions.item.assertions.item.earl:result.earl:outcome":
+                outcome = value
+            elif prefix == "assertions.item.assertions.item.earl:result.dct:description":
+                description = value
+            elif prefix == "assertions.item.assertions.item" and event == "end_map":
+                if outcome == "fail":
+                    violations.append(Violation(document, rule, impact, description))
+            elif prefix == "assertions.item" and event == "start_map":
+                document = None
+        return cls(violations, **fields)
+
+    @property
+    def passed(self):
+        # type: () -> bool
+        """Check if the report has no violations."""
+        return not self.violations
+
+    def query(self, rule=None, impact=None, document=None):
+        # type: (str|None, str|None, str|None) -> list[Violation]
+        """Return violations matching all given criteria."""
+        candidates = self.violations
+        lookups = ((self.by_rule, rule), (self.by_impact, impact), (self.by_document, document))
+        for index, key in lookups:
+            if key is not None and len(index.get(key, ())) < len(candidates):
+                candidates = index.get(key, [])
+        return [
+            v
+            for v in candidates
+            if (rule is None or v.rule == rule)
+            and (impact is None or v.impact == impact)
+            and (document is None or v.document == document)
+        ]
+
+    def summary(self):
+        # type: () -> dict
+        """Return violation counters in total, per impact level, per rule and per document."""
+        return {
+            "outcome": self.outcome,
+            "total": len(self.violations),
+            "impact": {impact: len(self.by_impact.get(impact, ())) for impact in IMPACTS},
+            "rules": {rule: len(found) for rule, found in self.by_rule.items()},
+            "documents": {doc: len(found) for doc, found in self.by_document.items()},
+        }
@@ -0,0 +1,147 @@
+"""Deterministic synthetic MagicEpub-style fixed layout EPUBs for benchmarks"""
+
+import random
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+
+CONTAINER_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+WORDS = {
+    "en": (
+        "the quick brown fox jumps over lazy dog while small birds sing in green trees "
+        "and children play near the old river under bright summer sky"
+    ).split(),
+    "de": (
+        "der schnelle braune fuchs springt über den faulen hund während kleine vögel in "
+        "grünen bäumen singen und kinder am alten fluss unter hellem sommerhimmel spielen"
+    ).split(),
+    "fr": (
+        "le renard brun rapide saute par dessus le chien paresseux pendant que les petits "
+        "oiseaux chantent dans les arbres verts et les enfants jouent près de la rivière"
+    ).split(),
+}
+
+
+@dataclass
+class BookSpec:
+    """Shape of a synthetic EPUB"""
+
+    pages: int = 500
+    image_size: int = 50_000
+    image_spread: float = 0.0  # Relative random deviation of the image sizes
+    trn_links: int = 1  # trn_link anchors per page
+    hotspots: int = 1  # Hotspot containers per page
+    lang: str = "en"
+    seed: int = 0
+
+
+def make_epub(path, pages=500, image_size=50_000, seed=0):
+    # type: (str|Path, int, int, int) -> Path
+    """Write a synthetic fixed layout EPUB with one background image per page.
+
+    :param path: Target file path of the EPUB.
+    :param pages: Number of spine pages.
+    :param image_size: Size in bytes of the (incompressible) background image per page.
+    :param seed: Seed for the deterministic random content.
+    :return: Path of the written EPUB.
+    """
+    return make_book(path, BookSpec(pages=pages, image_size=image_size, seed=seed))
+
+
+def make_book(path, spec):
+    # type: (str|Path, BookSpec) -> Path
+    """Write a synthetic fixed layout EPUB of the given shape.
+
+    :param path: Target file path of the EPUB.
+    :param spec: Page count, image sizes, link density and language of the book.
+    :return: Path of the written EPUB.
+    """
+    path = Path(path)
+    rnd = random.Random(spec.seed)
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        zf.writestr("META-INF/container.xml", CONTAINER_XML)
+        zf.writestr("OEBPS/content.opf", opf_xml(spec.pages))
+        zf.writestr("OEBPS/nav.xhtml", nav_xhtml())
+        for i in range(1, spec.pages + 1):
+            zf.writestr(f"OEBPS/page_{i:04d}.xhtml", page_xhtml(i, rnd, spec))
+            zf.writestr(
+                f"OEBPS/images/page_{i:04d}.jpg",
+                rnd.randbytes(image_size(spec, rnd)),
+                compress_type=zipfile.ZIP_STORED,
+            )
+    return path
+
+
+def image_size(spec, rnd):
+    # type: (BookSpec, random.Random) -> int
+    """Draw the size of a background image."""
+    if not spec.image_spread:
+        return spec.image_size
+    return max(0, round(spec.image_size * (1 + rnd.uniform(-1, 1) * spec.image_spread)))
+
+
+def opf_xml(pages):
+    # type: (int) -> str
+    """Build the package document for `pages` spine items."""
+    items, refs = [], []
+    for i in range(1, pages + 1):
+        items.append(
+            f'<item id="p{i}" href="page_{i:04d}.xhtml" media-type="application/xhtml+xml"/>'
+        )
+        items.append(f'<item id="i{i}" href="images/page_{i:04d}.jpg" media-type="image/jpeg"/>')
+        refs.append(f'<itemref idref="p{i}"/>')
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="uid">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:identifier id="uid">urn:uuid:00000000-0000-0000-0000-000000000000</dc:identifier>
+    <dc:title>Synthetic</dc:title>
+    <meta property="rendition:layout">pre-paginated</meta>
+  </metadata>
+  <manifest>
+    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>
+    {"".join(items)}
+  </manifest>
+  <spine>{"".join(refs)}</spine>
+</package>
+"""
+
+
+def nav_xhtml():
+    # type: () -> str
+    """Build a minimal navigation document."""
+    return """<?xml version="1.0" encoding="UTF-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">
+<head><title>Nav</title></head>
+<body>
+<nav epub:type="toc"><ol><li><a href="page_0001.xhtml">Start</a></li></ol></nav>
+<nav epub:type="landmarks"><ol><li>
+<a epub:type="bodymatter" href="page_0001.xhtml">Start</a>
+</li></ol></nav>
+</body>
+</html>
+"""
+
+
+def page_xhtml(index, rnd, spec=BookSpec()):
+    # type: (int, random.Random, BookSpec) -> str
+    """Build a fixed layout page with text, trn_links and hotspots."""
+    text = " ".join(rnd.choice(WORDS[spec.lang]) for _ in range(40))
+    links = f'<a class="trn_link" href="#p{index}"></a>\n' * spec.trn_links
+    hotspot = f'<div class="hotspot"><a href="page_{index:04d}.xhtml"></a></div>\n'
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head><title>Page {index}</title></head>
+<body>
+<img src="images/page_{index:04d}.jpg" alt=""/>
+<p>{text}</p>
+{links}{hotspot * spec.hotspots}</body>
+</html>
+"""
@@ -0,0 +1,75 @@
+"""Streaming plaintext extraction from XML documents"""
+
+from lxml import etree
+
+SKIP_TAGS = {"script", "style"}
+
+
+class TextTarget:
+    """Parser target collecting stripped text nodes without building a tree"""
+
+    def __init__(self, budget=None):
+        # type: (int|None) -> None
+        self.budget = budget
+        self.parts = []  # type: list[str]
+        self.size = 0
+        self.buffer = []  # type: list[str]
+        self.skip_depth = 0
+
+    @property
+    def full(self) -> bool:
+        return self.budget is not None and self.size >= self.budget
+
+    def flush(self):
+        # type: () -> None
+        """Add the buffered text node to the collected parts."""
+        text = "".join(self.buffer).strip()
+        self.buffer = []
+        if text and not self.full:
+            self.parts.append(text)
+            self.size += len(text) + 1
+
+    def start(self, tag, attrib):
+        self.flush()
+        if self.skip_depth or local_name(tag) in SKIP_TAGS:
+            self.skip_depth += 1
+
+    def end(self, tag):
+        self.flush()
+        if self.skip_depth:
+            self.skip_depth -= 1
+
+    def data(self, data):
+        if not self.skip_depth:
+            self.buffer.append(data)
+
+    def close(self):
+        # type: () -> str
+        self.flush()
+        return "\n".join(self.parts)
+
+
+def local_name(tag):
+    # type: (str) -> str
+    """Strip the namespace from a Clark notation tag name."""
+    return tag.rpartition("}")[2]
+
+
+def xml_text(data, budget=None, chunk_size=2**14):
+    # type: (bytes, int|None, int) -> str
+    """Extract plaintext content from serialized XML without building a tree.
+
+    Text within <script> and <style> is skipped.
+
+    :param data: Serialized XML document.
+    :param budget: Number of text characters after which parsing stops (None for all text).
+    :param chunk_size: Number of bytes fed to the parser at once.
+    :return: Stripped text nodes joined by newlines.
+    """
+    target = TextTarget(budget)
+    parser = etree.XMLParser(target=target, resolve_entities=False, no_network=True)
+    for offset in range(0, len(data), chunk_size):
+        parser.feed(data[offset : offset + chunk_size])
+        if target.full:
+            return target.close()
+    return parser.close()
@@ -0,0 +1,181 @@
+"""Incremental verification of fixed EPUBs with DAISY Ace"""
+
+import hashlib
+import json
+import tempfile
+from pathlib import Path
+from typing import Callable
+from loguru import logger as log
+from lxml import etree
+from accfix.check import run_ace
+from accfix.epub import Epub
+from accfix.opf import NS
+from accfix.report import IMPACTS
+
+DIFF_NAME = "diff.json"
+HASHES_NAME = "hashes.json"
+REPORT_NAME = "report.json"
+RULESETS = ("wcag2a", "wcag2aa", "wcag21aa", "EPUB", "best-practice")
+COUNTERS = (*IMPACTS, "total")
+
+
+def document_hashes(epub):
+    # type: (Epub) -> dict[str, str]
+    """Return the SHA-256 of every spine document and the OPF-File by archive path."""
+    paths = [epub.opf_path(), *epub.pages()]
+    return {p.as_posix(): hashlib.sha256(epub.read(p)).hexdigest() for p in paths}
+
+
+def assertion_document(assertion, epub):
+    # type: (dict, Epub) -> str|None
+    """Resolve the test subject of a document assertion to an archive path."""
+    url = assertion.get("earl:testSubject", {}).get("url", "").split("#")[0]
+    if not url:
+        return None
+    known = {p.as_posix() for p in epub.package().by_path}
+    relative = (epub.opf_path().parent / url).as_posix()
+    return url if url in known else relative if relative in known else None
+
+
+def violations(report, epub):
+    # type: (dict, Epub) -> set[tuple[str|None, str, str|None]]
+    """Return failed checks of a report as (document, rule, impact) tuples.
+
+    Violations not tied to a manifest document (e.g. package metadata) have document None.
+    """
+    found = set()
+    for doc_assertion in report.get("assertions", []):
+        document = assertion_document(doc_assertion, epub)
+        for assertion in doc_assertion.get("assertions", []):
+            if assertion.get("earl:result", {}).get("earl:outcome") != "fail":
+                continue
+            test = assertion.get("earl:test", {})
+            found.add((document, test.get("dct:title"), test.get("earl:impact")))
+    return found
+
+
+def diff_reports(before, after, epub):
+    # type: (dict, dict, Epub) -> dict[str, list[tuple[str|None, str, str|None]]]
+    """Compare reports from before and after a fix.
+
+    :return: Violations that were "fixed", that are "new" and that "remain".
+    """
+    old, new = violations(before, epub), violations(after, epub)
+    return {
+        "fixed": sorted(old - new, key=str),
+        "new": sorted(new - old, key=str),
+        "remain": sorted(old & new, key=str),
+    }
+
+
+def subset_epub(src, documents, dst):
+    # type: (Path, set[str], Path) -> Path
+    """Write a copy of an EPUB whose spine only contains the given documents."""
+    epub = Epub(src, clone_path=dst)
+    opf_tree = epub.opf_tree()
+    spine = opf_tree.getroot().find("opf:spine", namespaces=NS)
+    manifest = epub.package().manifest
+    for itemref in list(spine):
+        item = manifest.get(itemref.get("idref"))
+        if item is None or item.path.as_posix() not in documents:
+            spine.remove(itemref)
+    opf = etree.tostring(opf_tree, xml_declaration=True, encoding="utf-8")
+    with epub.transaction():  # The commit writes dst in one pass without copying src first
+        epub.write(epub.opf_path(), opf)
+    epub.close()
+    return dst
+
+
+def merge_reports(previous, partial, documents, epub):
+    # type: (dict, dict, set[str], Epub) -> dict
+    """Replace the assertions of re-checked documents and of the package in previous report.
+
+    Everything else (outlines, extracted data, metadata, ...) is kept from the full report,
+    the overall result and the violation summary are recomputed.
+
+    :param previous: Full report of an earlier run.
+    :param partial: Report of a check over the re-checked documents only.
+    :param documents: Archive paths of the re-checked documents.
+    :param epub: The checked EPUB used to resolve document paths.
+    """
+    kept = [
+        assertion
+        for assertion in previous.get("assertions", [])
+        if assertion_document(assertion, epub) not in documents | {None}
+    ]
+    merged = dict(previous, assertions=kept + partial.get("assertions", []))
+    summary = violation_summary(merged["assertions"])
+    merged["earl:result"] = {"earl:outcome": "fail" if summary["total"]["total"] else "pass"}
+    if "violationSummary" in previous or "violationSummary" in partial:
+        merged["violationSummary"] = summary
+    return merged
+
+
+def violation_summary(assertions):
+    # type: (list[dict]) -> dict[str, dict[str, int]]
+    """Count failed checks per ruleset and impact like Ace's `violationSummary`."""
+    summary = {ruleset: dict.fromkeys(COUNTERS, 0) for ruleset in (*RULESETS, "other", "total")}
+    for doc_assertion in assertions:
+        for assertion in doc_assertion.get("assertions", []):
+            if assertion.get("earl:result", {}).get("earl:outcome") != "fail":
+                continue
+            test = assertion.get("earl:test", {})
+            tags = test.get("earl:rulesetTags", [])
+            ruleset = next((tag for tag in tags if tag in RULESETS), "other")
+            for counts in (summary[ruleset], summary["total"]):
+                if test.get("earl:impact") in IMPACTS:
+                    counts[test["earl:impact"]] += 1
+                counts["total"] += 1
+    return summary
+
+
+def check_json(fp):
+    # type: (Path) -> dict
+    """Run a full Ace check and return the raw report needed for merging."""
+    return json.loads(run_ace(fp).read_text(encoding="utf-8"))
+
+
+def verify(fp, runner=check_json):
+    # type: (str|Path, Callable[[Path], dict]) -> dict
+    """Check an EPUB with Ace, re-checking only documents changed since the last run.
+
+    The merged report and the document hashes are stored in the EPUB's report directory, along
+    with the violations fixed, new and remaining since the previous report (see `diff_reports`).
+
+    :param fp: Path of the EPUB to verify.
+    :param runner: Function that runs a full Ace check of an EPUB and returns the report.
+    :return: The (merged) Ace report.
+    """
+    fp = Path(fp)
+    report_dir = fp.parent / f"{fp.stem}_report"
+    epub = Epub(fp, clone=False)
+    hashes = document_hashes(epub)
+    try:
+        previous = json.loads((report_dir / REPORT_NAME).read_text(encoding="utf-8"))
+        old_hashes = json.loads((report_dir / HASHES_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        previous = old_hashes = None
+    if previous is None:
+        log.info(f"Full Ace check of {fp.name}")
+        report = runner(fp)
+    else:
+        changed = {path for path, digest in hashes.items() if old_hashes.get(path) != digest}
+        changed.discard(epub.opf_path().as_posix())
+        if not changed and old_hashes == hashes:
+            epub.close()
+            return previous
+        if not changed:  # Only the OPF changed, but the subset needs a non-empty spine
+            changed.add(epub.pages()[0].as_posix())
+        log.info(f"Re-checking {len(changed)} of {len(hashes) - 1} documents of {fp.name}")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            subset = subset_epub(fp, changed, Path(temp_dir) / fp.name)
+            partial = runner(subset)
+        report = merge_reports(previous, partial, changed, epub)
+    diff = diff_reports(previous, report, epub) if previous is not None else None
+    epub.close()
+    report_dir.mkdir(exist_ok=True)
+    if diff is not None:
+        (report_dir / DIFF_NAME).write_text(json.dumps(diff, indent=2), encoding="utf-8")
+    (report_dir / REPORT_NAME).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    (report_dir / HASHES_NAME).write_text(json.dumps(hashes, indent=2), encoding="utf-8")
+    return report
@@ -1,12 +1,191 @@
+import copy
+import os
+import shutil
+import struct
+import tempfile
+import warnings
+import zipfile
+from typing import BinaryIO, Iterable
 from zipfile import ZipFile, ZipInfo
 
 
+def copy_raw(src, dst, zinfo, chunk_size=2**20):
+    # type: (ZipFile, ZipFile, ZipInfo, int) -> ZipInfo
+    """Copy a member with its compressed bytes as-is (no inflate/deflate roundtrip).
+
+    :param src: Archive to read the member from.
+    :param dst: Archive opened for writing to append the member to.
+    :param zinfo: Member of `src` to copy.
+    :param chunk_size: Size of the chunks used to move the compressed data.
+    :return: The new ZipInfo of the copied member in `dst`.
+    """
+    if dst._writing:
+        raise ValueError("Can't write to ZIP archive while an open writing handle exists")
+    new_info = copy.copy(zinfo)
+    new_info.flag_bits &= ~zipfile._MASK_USE_DATA_DESCRIPTOR
+    new_info.extra = zipfile._strip_extra(zinfo.extra, (1,))
+    zip64 = max(zinfo.file_size, zinfo.compress_size) > zipfile.ZIP64_LIMIT
+    with src._lock, dst._lock:
+        src.fp.seek(zinfo.header_offset)
+        fheader = struct.unpack(zipfile.structFileHeader, src.fp.read(zipfile.sizeFileHeader))
+        if fheader[zipfile._FH_SIGNATURE] != zipfile.stringFileHeader:
+            raise zipfile.BadZipFile("Bad magic number for file header")
+        src.fp.seek(
+            fheader[zipfile._FH_FILENAME_LENGTH] + fheader[zipfile._FH_EXTRA_FIELD_LENGTH], 1
+        )
+        if dst._seekable:
+            dst.fp.seek(dst.start_dir)
+        new_info.header_offset = dst.fp.tell()
+        dst._writecheck(new_info)
+        dst._didModify = True
+        dst.fp.write(new_info.FileHeader(zip64))
+        remaining = zinfo.compress_size
+        while remaining > 0:
+            data = src.fp.read(min(remaining, chunk_size))
+            if not data:
+                raise EOFError(f"Truncated member data for {zinfo.filename}")
+            dst.fp.write(data)
+            remaining -= len(data)
+        dst.start_dir = dst.fp.tell()
+        dst.filelist.append(new_info)
+        dst.NameToInfo[new_info.filename] = new_info
+    return new_info
+
+
+def copy_range(src, dst, offset, size, chunk_size=2**22):
+    # type: (BinaryIO, BinaryIO, int, int, int) -> int
+    """Append size bytes at offset of src to dst, in kernel space where supported.
+
+    :return: Number of copied bytes.
+    """
+    dst.flush()
+    copied = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while copied < size:
+                count = os.copy_file_range(
+                    src.fileno(), dst.fileno(), size - copied, offset + copied
+                )
+                if count == 0:
+                    raise EOFError("Unexpected end of ZIP archive")
+                copied += count
+            dst.seek(0, os.SEEK_END)
+            return copied
+        except OSError:
+            dst.seek(0, os.SEEK_END)  # e.g. EXDEV or unsupported file system, copy in userspace
+    src.seek(offset + copied)
+    while copied < size:
+        data = src.read(min(size - copied, chunk_size))
+        if not data:
+            raise EOFError("Unexpected end of ZIP archive")
+        dst.write(data)
+        copied += len(data)
+    return copied
+
+
+def sync_dir(path):
+    # type: (str) -> None
+    """Flush a directory entry (e.g. a rename) to disk where the platform supports it."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # pragma: no cover (e.g. directories can't be opened on Windows)
+        return
+    try:
+        os.fsync(fd)
+    except OSError:  # pragma: no cover
+        pass
+    finally:
+        os.close(fd)
+
+
 class ZipFileR(ZipFile):
     """Extended ZipFile that can remove files from a zip archive."""
 
+    reclaim_ratio = 0.5  # Share of superseded bytes in the archive that triggers `compact`
+
+    def close(self):
+        """Drop superseded entries and write the central directory."""
+        if self.fp is not None and self.mode in ("w", "x", "a") and not self._writing:
+            self.compact()
+        super().close()
+
+    def replace(self, zinfo_or_arcname, data):
+        # type: (ZipInfo|str, bytes|str) -> None
+        """Append a new version of a member without moving the rest of the archive.
+
+        The previous entry stays in place until superseded entries exceed `reclaim_ratio` of
+        the archive or the archive is closed.
+        """
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", "Duplicate name", UserWarning)
+            self.writestr(zinfo_or_arcname, data)
+        self.reclaim()
+
+    def wasted_bytes(self):
+        # type: () -> int
+        """Return the size of all entries superseded by a later member of the same name."""
+        filelist = sorted(self.filelist, key=lambda x: x.header_offset)
+        ends = [info.header_offset for info in filelist[1:]] + [self.start_dir]
+        return sum(
+            end - info.header_offset
+            for info, end in zip(filelist, ends)
+            if self.NameToInfo[info.filename] is not info
+        )
+
+    def reclaim(self):
+        # type: () -> int
+        """Compact the archive if superseded entries exceed `reclaim_ratio` of its size.
+
+        :return: Number of dropped entries.
+        """
+        if self.wasted_bytes() > self.reclaim_ratio * self.start_dir:
+            return self.compact()
+        return 0
+
     def remove(self, zinfo_or_arcname):
         """Remove a member from the archive."""
+        return self.remove_many([zinfo_or_arcname])
+
+    def remove_many(self, members):
+        # type: (Iterable[ZipInfo|str]) -> None
+        """Remove several members (ZipInfo objects or names) in a single pass over the archive.
+
+        Archives on disk are rewritten to a complete temporary archive that atomically replaces
+        the original, so an interrupted removal leaves either the old or the new archive behind.
+        """
+        self._check_removable()
+        zinfos = set()
+        for zinfo_or_arcname in members:
+            # Make sure we have an existing info object
+            if isinstance(zinfo_or_arcname, ZipInfo):
+                if zinfo_or_arcname not in self.filelist:
+                    raise KeyError("There is no item %r in the archive" % zinfo_or_arcname)
+                zinfos.add(zinfo_or_arcname)
+            else:
+                zinfos.add(self.getinfo(zinfo_or_arcname))
+        if not zinfos:
+            return
+        if self._on_disk():
+            self._rewrite(zinfos)
+        else:
+            self._remove_members(zinfos)
+
+    def compact(self):
+        # type: () -> int
+        """Drop all entries superseded by a later member of the same name.
 
+        :return: Number of dropped entries.
+        """
+        self._check_removable()
+        superseded = {
+            zinfo for zinfo in self.filelist if self.NameToInfo[zinfo.filename] is not zinfo
+        }
+        if superseded:
+            self.remove_many(superseded)
+        return len(superseded)
+
+    def _check_removable(self):
+        # type: () -> None
         if self.mode not in ("w", "x", "a"):
             raise ValueError("remove() requires mode 'w', 'x', or 'a'")
         if not self.fp:
@@ -14,17 +193,60 @@ class ZipFileR(ZipFile):
         if self._writing:
             raise ValueError("Can't write to ZIP archive while an open writing handle exists")
 
-        # Make sure we have an existing info object
-        if isinstance(zinfo_or_arcname, ZipInfo):
-            zinfo = zinfo_or_arcname
-            # make sure zinfo exists
-            if zinfo not in self.filelist:
-                raise KeyError("There is no item %r in the archive" % zinfo_or_arcname)
-        else:
-            # get the info object
-            zinfo = self.getinfo(zinfo_or_arcname)
+    def _on_disk(self):
+        # type: () -> bool
+        """Check if the archive was opened by file name (and can be replaced atomically)."""
+        return not self._filePassed and isinstance(self.filename, str)
+
+    def _rewrite(self, members, chunk_size=2**22):
+        # type: (set[ZipInfo], int) -> None
+        """Copy all entries except members to a temporary archive and swap it in atomically.
 
-        return self._remove_members({zinfo})
+        Entries are copied byte-for-byte (local header, data and data descriptor), only their
+        offsets in the central directory change. The temporary archive gets its own central
+        directory and is synced to disk before the rename, so the file is readable at any time.
+        """
+        with self._lock:
+            self.fp.flush()
+            source, start_dir, filelist = self.fp, self.start_dir, self.filelist
+            entries = sorted(filelist, key=lambda x: x.header_offset)
+            offsets = [info.header_offset for info in entries]
+            ends = offsets[1:] + [start_dir]
+            directory = os.path.dirname(os.path.abspath(self.filename))
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                shutil.copymode(self.filename, temp_path)
+                with open(fd, "wb") as temp:
+                    position = copy_range(source, temp, 0, offsets[0], chunk_size)
+                    for info, end in zip(entries, ends):
+                        if info in members:
+                            continue
+                        size = end - info.header_offset
+                        copy_range(source, temp, info.header_offset, size, chunk_size)
+                        info.header_offset = position
+                        position += size
+                    self.fp, self.start_dir = temp, position
+                    self.filelist = [info for info in filelist if info not in members]
+                    self._write_end_record()
+                    os.fsync(temp.fileno())
+                os.replace(temp_path, self.filename)
+            except BaseException:
+                for info, offset in zip(entries, offsets):
+                    info.header_offset = offset
+                self.fp, self.start_dir, self.filelist = source, start_dir, filelist
+                os.unlink(temp_path)
+                raise
+            sync_dir(directory)
+            source.close()
+            self.fp = open(self.filename, "r+b")
+            for info in members:
+                if self.NameToInfo.get(info.filename) is info:
+                    del self.NameToInfo[info.filename]
+            # Restore shadowed entries of duplicated names, the last added one wins
+            for info in reversed(self.filelist):
+                self.NameToInfo.setdefault(info.filename, info)
+            self._didModify = True
+            self.fp.seek(self.start_dir)
 
     def _remove_members(self, members, *, remove_physical=True, chunk_size=2**20):
         """Remove members in a zip file.
@@ -1,26 +1,81 @@
 import streamlit as st
-import tempfile
-import os
+import time
+from dataclasses import dataclass
 from loguru import logger as log
+from accfix.cache import ResultCache, content_key
 from accfix.epub import Epub
+from accfix.jobs import JobQueue
 from accfix.lang import detect_epub_lang
-from accfix.ace_fix import ace_fix_mec
-import shutil
-import telegram
-from telegram.error import TelegramError
-import asyncio
+from accfix.notify import Notifier
 import dotenv
 
 dotenv.load_dotenv()
+result_cache = ResultCache()
+POLL_INTERVAL = 0.5  # Seconds between job state updates
+STALL_TIMEOUT = 300  # Seconds without job progress before the page stops waiting
 
 
-def save_uploaded_file(uploaded_file):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".epub") as tmp_file:
-        tmp_file.write(uploaded_file.getbuffer())
-        return tmp_file.name
+@st.cache_resource
+def job_queue():
+    # Shared by all sessions, so fixes run in one bounded worker pool per host
+    return JobQueue()
 
 
-def apply_accessibility_fixes(epub):
+@st.cache_resource
+def notifier():
+    # One background loop and HTTP session for all sessions, requests only enqueue
+    return Notifier()
+
+
+@dataclass
+class UploadState:
+    """Upload-derived state memoized across reruns of a session"""
+
+    file_id: str
+    cache_key: str
+    lang: str | None = None  # Detected on demand, cache hits never open the upload
+    detected: bool = False
+
+
+def upload_state(uploaded_file):
+    # Hash the upload once instead of on every rerun
+    state = st.session_state.get("upload")
+    if state is not None and state.file_id == uploaded_file.file_id:
+        return state
+    release_upload()
+    state = UploadState(
+        file_id=uploaded_file.file_id,
+        cache_key=content_key(uploaded_file.getbuffer()),
+    )
+    st.session_state["upload"] = state
+    return state
+
+
+def upload_lang(state, uploaded_file):
+    # Open the upload read-only and detect its language once per upload
+    if not state.detected:
+        epub = Epub(uploaded_file, clone=False)  # Read only, never modifies the upload
+        try:
+            state.lang = detect_epub_lang(epub)
+        finally:
+            epub.close()
+        state.detected = True
+    return state.lang
+
+
+def release_upload():
+    # Forget the state of a replaced or removed upload
+    st.session_state.pop("upload", None)
+
+
+def show_language(detected_language):
+    if detected_language:
+        st.success(f"Detected language: {detected_language}")
+    else:
+        st.warning("Unable to detect the language of the EPUB.")
+
+
+def show_job_progress(queue, job_id):
     progress_bar = st.progress(0)
     status_text = st.empty()
 
@@ -44,122 +99,117 @@ def apply_accessibility_fixes(epub):
     message_area = message_container.empty()
 
     messages = []
+    seq = -1
+    waited = False  # Only report jobs that finished while this run was watching
+    state = None
+    last_change = time.monotonic()
+
+    while True:
+        job = queue.get(job_id)
+        for seq, stage, message in queue.events(job_id, seq):
+            messages.insert(0, message)  # Prepend new messages
+        if (job.status, job.fraction, seq) != state:
+            state = (job.status, job.fraction, seq)
+            last_change = time.monotonic()
+        if messages:
+            status_text.text(messages[0])
+            message_area.markdown(
+                f'<div class="scrollable-container">{"<br>".join(messages)}</div>',
+                unsafe_allow_html=True,
+            )
+        progress_bar.progress(job.fraction)
+        if job.finished:
+            break
+        if time.monotonic() - last_change > STALL_TIMEOUT:
+            break  # The queue fails jobs of dead workers, this only bounds the wait
+        waited = True
+        time.sleep(POLL_INTERVAL)
 
-    for i, message in enumerate(ace_fix_mec(epub), 1):
-        messages.insert(0, message)  # Prepend new messages
-        status_text.text(message)
-        message_area.markdown(
-            f'<div class="scrollable-container">{"<br>".join(messages)}</div>',
-            unsafe_allow_html=True,
-        )
-        progress = min(i / 10, 1.0)  # Assuming about 10 main steps
-        progress_bar.progress(progress)
-
-    progress_bar.progress(1.0)
-    status_text.text("Accessibility fixes completed successfully!")
-
-    return epub
+    if job.status == "done":
+        status_text.text("Accessibility fixes completed successfully!")
+    return job, waited
 
 
 def offer_download(fixed_epub, original_filename):
-    # Save the fixed EPUB to a temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".epub") as tmp_file:
-        fixed_epub._zf.close()  # Ensure the ZipFile is closed
-        shutil.copy2(fixed_epub.path, tmp_file.name)
+    # Cached and job results are shared files, open them read-only. Streamlit still reads the
+    # whole file into memory to serve the button.
+    log.debug(f"Fixed EPUB size: {fixed_epub.stat().st_size} bytes")
 
-        # Log file size for debugging
-        log.debug(f"Fixed EPUB size: {os.path.getsize(tmp_file.name)} bytes")
+    # Add vertical space before the download button
+    st.markdown("<br>", unsafe_allow_html=True)
 
-        # Read the temporary file
-        with open(tmp_file.name, "rb") as file:
-            fixed_epub_bytes = file.read()
-
-        # Add vertical space before the download button
-        st.markdown("<br>", unsafe_allow_html=True)
-
-        # Offer download
+    with open(fixed_epub, "rb") as file:
         st.download_button(
             label="Download Fixed EPUB",
-            data=fixed_epub_bytes,
+            data=file,
             file_name=f"fixed_{original_filename}",
             mime="application/epub+zip",
         )
 
-    # Clean up the temporary file
-    os.unlink(tmp_file.name)
-
-
-def cleanup(tmp_file_path, epub):
-    try:
-        os.unlink(tmp_file_path)
-        log.info(f"Temporary file {tmp_file_path} deleted successfully")
-    except Exception as e:
-        log.warning(f"Failed to delete temporary file {tmp_file_path}: {str(e)}")
-
-    if hasattr(epub, "_clone") and epub._clone:
-        try:
-            os.unlink(epub._clone)
-            log.info(f"Cloned file {epub._clone} deleted successfully")
-            os.rmdir(os.path.dirname(epub._clone))
-            log.info(f"Temporary directory {os.path.dirname(epub._clone)} deleted successfully")
-        except Exception as e:
-            log.warning(f"Failed to delete cloned file or directory: {str(e)}")
-
-
-async def send_telegram_notification(message, file_path=None):
-    bot_token = os.environ.get("TELEGRAM_BOT_TOKEN")
-    chat_id = os.environ.get("TELEGRAM_CHAT_ID")
-
-    bot = telegram.Bot(token=bot_token)
-
-    try:
-        if file_path:
-            with open(file_path, "rb") as file:
-                await bot.send_document(chat_id=chat_id, document=file, caption=message)
-        else:
-            await bot.send_message(chat_id=chat_id, text=message)
-    except TelegramError as e:
-        log.error(f"Failed to send Telegram notification: {e}")
-
-
-def send_telegram_notification_sync(message, file_path=None):
-    asyncio.run(send_telegram_notification(message, file_path))
-
 
 def main():
     st.title("EPUB Accessibility Fixer (Beta)")
     st.subheader("For Fixed Layout EPUBs from [MagicEPUB](https://magicepub.com)")
     uploaded_file = st.file_uploader("Upload an EPUB file", type=["epub"])
+    queue = job_queue()
 
-    if uploaded_file is not None:
-        tmp_file_path = save_uploaded_file(uploaded_file)
-        epub = None
-
+    if uploaded_file is None:
+        release_upload()
+    else:
         try:
-            epub = Epub(tmp_file_path, clone=True)
-            detected_language = detect_epub_lang(epub)
-            if detected_language:
-                st.success(f"Detected language: {detected_language}")
-            else:
-                st.warning("Unable to detect the language of the EPUB.")
-
-            if st.button("Fix Accessibility"):
-                fixed_epub = apply_accessibility_fixes(epub)
-                offer_download(fixed_epub, uploaded_file.name)
-                send_telegram_notification_sync(
-                    f"File processed successfully: {uploaded_file.name}"
-                )
-
+            upload = upload_state(uploaded_file)
+            cached = result_cache.get(upload.cache_key)
+            # A cache hit skips straight to the download without opening the upload
+            lang = cached.lang if cached else upload_lang(upload, uploaded_file)
         except Exception as e:
             st.error(f"An error occurred: {str(e)}")
-            log.exception("Error during EPUB processing")
-            send_telegram_notification_sync(
-                f"Error processing file: {uploaded_file.name}\n\nError: {str(e)}", tmp_file_path
+            log.exception("Error reading uploaded EPUB")
+            notifier().notify(
+                f"Error processing file: {uploaded_file.name}\n\nError: {str(e)}",
+                uploaded_file.getvalue(),
+                uploaded_file.name,
+            )
+            return
+        show_language(lang)
+        if cached:
+            offer_download(cached.path, uploaded_file.name)
+            return
+
+        if st.button("Fix Accessibility"):
+            data = uploaded_file.getbuffer()
+            try:
+                job_id = queue.submit(data, uploaded_file.name, upload.cache_key)
+            except Exception as e:
+                st.error(f"Could not start the fix: {str(e)}")
+                log.exception("Error submitting job")
+                return
+            st.query_params["job"] = job_id
+
+    # The job id is kept in the URL, so a browser refresh reconnects to a running job
+    job_id = st.query_params.get("job")
+    job = queue.get(job_id) if job_id else None
+    if job is None or (uploaded_file is not None and uploaded_file.name != job.name):
+        return
+
+    job, waited = show_job_progress(queue, job_id)
+    if uploaded_file is None:
+        show_language(job.lang)
+    if not job.finished:
+        st.warning("The job is not making progress. Reload the page to keep waiting.")
+        log.warning(f"Job {job_id} stalled in status {job.status}")
+    elif job.status == "done":
+        offer_download(queue.artifact(job_id), job.name)
+        if waited:
+            notifier().notify(f"File processed successfully: {job.name}")
+    else:
+        st.error(f"An error occurred: {job.error}")
+        log.error(f"Job {job_id} failed: {job.error}")
+        if waited:
+            notifier().notify(
+                f"Error processing file: {job.name}\n\nError: {job.error}",
+                queue.source(job_id).read_bytes(),
+                job.name,
             )
-
-        finally:
-            if epub:
-                cleanup(tmp_file_path, epub)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+"""Stand-in for accfix/ace_worker.js that speaks the @@ACE-DONE protocol without Ace
+
+The behavior depends on the EPUB name: "crash" exits mid-job, "hang" never answers, "fail"
+reports a failed check and any other name gets a report with one violation.
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+DONE = "@@ACE-DONE "
+REPORT = {
+    "earl:result": {"earl:outcome": "fail"},
+    "earl:testSubject": {"metadata": {"dc:title": "Stub"}},
+    "assertions": [
+        {
+            "earl:testSubject": {"url": "page_0001.xhtml"},
+            "assertions": [
+                {
+                    "earl:test": {"dct:title": "link-name", "earl:impact": "serious"},
+                    "earl:result": {"earl:outcome": "fail"},
+                }
+            ],
+        }
+    ],
+}
+
+for line in sys.stdin:
+    job = json.loads(line)
+    name = Path(job["epub"]).stem
+    print(f"\x1b[32minfo\x1b[0m Processing {name}", flush=True)
+    if name == "crash":
+        sys.exit(3)
+    if name == "hang":
+        time.sleep(3600)
+    if name == "fail":
+        print(DONE + json.dumps({"status": 1, "report": None}), flush=True)
+        continue
+    report = Path(job["outdir"]) / "report.json"
+    report.write_text(json.dumps(REPORT), encoding="utf-8")
+    print("info Done", flush=True)
+    print(DONE + json.dumps({"status": 0, "report": str(report)}), flush=True)
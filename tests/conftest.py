@@ -0,0 +1,36 @@
+import shutil
+from itertools import count
+import pytest
+from accfix.synth import BookSpec, make_book
+
+BOOK = BookSpec(pages=200, image_size=50_000, image_spread=0.5, trn_links=2, hotspots=2)
+
+
+class BookCopies:
+    """Factory of fresh, writable copies of a synthetic EPUB"""
+
+    def __init__(self, book, target_dir):
+        self.book = book
+        self.target_dir = target_dir
+        self.counter = count()
+
+    def __call__(self):
+        return shutil.copyfile(self.book, self.target_dir / f"book_{next(self.counter)}.epub")
+
+
+@pytest.fixture(scope="session")
+def book(tmp_path_factory):
+    """Synthetic MagicEpub-style EPUB shared by all benchmarks (read only)."""
+    return make_book(tmp_path_factory.mktemp("books") / "book.epub", BOOK)
+
+
+@pytest.fixture
+def book_copy(book, tmp_path):
+    """Fresh, writable copies of the synthetic EPUB per benchmark round."""
+    return BookCopies(book, tmp_path)
+
+
+@pytest.fixture
+def small_book(tmp_path):
+    """Small writable synthetic EPUB for behavior tests."""
+    return make_book(tmp_path / "small.epub", BookSpec(pages=3, image_size=1000))
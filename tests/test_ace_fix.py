@@ -0,0 +1,81 @@
+import zipfile
+from collections import Counter
+from lxml import etree
+from accfix.ace_fix import PAGE_RULES, Rule, ace_fix_mec, apply_rules, fix_page, rule_report
+from accfix.epub import Epub
+
+PAGE = "OEBPS/page_0001.xhtml"
+NS = {"xhtml": "http://www.w3.org/1999/xhtml"}
+RULES_PAGE = b"""<html xmlns="http://www.w3.org/1999/xhtml"><body>
+<a class="trn_link" href="#p1"></a><a class="other" href="#p2"></a>
+<div class="hotspot"><span><a href="p.xhtml"></a></span><a href="q.xhtml"></a></div>
+<div class="hotspot"><img src="x.png"/></div>
+<div class="hotspot"><a class="trn_link" href="#p3"></a></div>
+</body></html>"""
+
+
+def fix(epub):
+    for _ in ace_fix_mec(epub):
+        pass
+    epub.close()
+
+
+def test_clone_of_compliant_book_is_created(small_book):
+    fix(Epub(small_book, clone=False))
+    fixed = small_book.with_name("fixed.epub")
+    fix(Epub(small_book, clone_path=fixed))
+    assert fixed.read_bytes() == small_book.read_bytes()
+
+
+def test_clone_is_fixed(small_book):
+    fixed = small_book.with_name("fixed.epub")
+    fix(Epub(small_book, clone_path=fixed))
+    with zipfile.ZipFile(fixed) as reader:
+        assert reader.testzip() is None
+        assert b'title="Link area"' in reader.read(PAGE)
+    with zipfile.ZipFile(small_book) as reader:
+        assert b'title="Link area"' not in reader.read(PAGE)
+
+
+def xpath_fixes(tree):
+    # The XPath fixes the rule engine replaced
+    for link in tree.xpath('//xhtml:a[@class="trn_link"]', namespaces=NS):
+        link.set("title", "Link area")
+    hotspots = tree.xpath('//xhtml:div[@class="hotspot"]', namespaces=NS)
+    for div in hotspots:
+        link = div.find(".//xhtml:a", namespaces=NS)
+        if link is not None:
+            link.set("title", "Link area")
+    return tree.xpath('//xhtml:a[@class="trn_link"]', namespaces=NS), hotspots
+
+
+def is_img(element):
+    return True
+
+
+def set_alt(element):
+    element.set("alt", "")
+
+
+def test_rules_match_xpath_fixes(book):
+    with zipfile.ZipFile(book) as reader:
+        pages = [reader.read(PAGE), RULES_PAGE]
+    for data in pages:
+        expected = etree.ElementTree(etree.fromstring(data))
+        links, hotspots = xpath_fixes(expected)
+        tree = etree.ElementTree(etree.fromstring(data))
+        hits = apply_rules(tree, PAGE_RULES)
+        assert etree.tostring(tree) == etree.tostring(expected)
+        assert hits == Counter(trn_link_title=len(links), hotspot_link_title=len(hotspots))
+
+
+def test_fix_page_applies_given_rules():
+    rule = Rule("img_alt", "{http://www.w3.org/1999/xhtml}img", is_img, set_alt)
+    data, hits, _ = fix_page(RULES_PAGE, "en", [rule])
+    assert hits == Counter(img_alt=1)
+    assert b'alt=""' in data and b"Link area" not in data
+
+
+def test_rule_report():
+    hits = Counter(trn_link_title=2)
+    assert rule_report(hits) == "Rule hits: trn_link_title=2, hotspot_link_title=0"
@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+import pytest
+from accfix.ace_service import AceService
+
+STUB = [sys.executable, str(Path(__file__).with_name("ace_worker_stub.py"))]
+
+
+@pytest.fixture
+def service():
+    service = AceService(workers=1, command=STUB, timeout=2)
+    yield service
+    service.close()
+
+
+def test_logs_are_streamed_and_report_returned(service, tmp_path):
+    job = service.submit(tmp_path / "book.epub")
+    assert list(job.logs()) == ["info Processing book", "info Done"]
+    report = job.result()
+    assert report.title == "Stub"
+    assert report.query(rule="link-name")[0].document == "page_0001.xhtml"
+    assert (tmp_path / "book_report" / "report.json").exists()
+
+
+def test_check_yields_logs_and_returns_report(service, tmp_path):
+    steps = service.check(tmp_path / "book.epub")
+    assert next(steps) == "info Processing book"
+    assert next(steps) == "info Done"
+    with pytest.raises(StopIteration) as stop:
+        next(steps)
+    assert len(stop.value.value) == 1
+
+
+def test_failed_check_raises(service, tmp_path):
+    job = service.submit(tmp_path / "fail.epub")
+    list(job.logs())
+    with pytest.raises(RuntimeError, match="Ace check failed"):
+        job.result()
+    assert service.submit(tmp_path / "book.epub").result(timeout=10).title == "Stub"
+
+
+def test_worker_is_restarted_after_crash(service, tmp_path):
+    crashed = service.submit(tmp_path / "crash.epub")
+    with pytest.raises(RuntimeError, match="exited with code 3"):
+        crashed.result(timeout=10)
+    assert service.submit(tmp_path / "book.epub").result(timeout=10).title == "Stub"
+
+
+def test_hung_worker_is_killed_and_restarted(service, tmp_path):
+    hung = service.submit(tmp_path / "hang.epub")
+    with pytest.raises(TimeoutError):
+        hung.result(timeout=10)
+    assert service.submit(tmp_path / "book.epub").result(timeout=10).title == "Stub"
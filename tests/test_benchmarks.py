@@ -0,0 +1,94 @@
+"""Benchmarks of the hot paths on synthetic EPUBs
+
+Run `poe bench` to store the results as JSON in `.benchmarks/` and compare them with the
+previous run.
+"""
+
+import pytest
+from accfix.ace_fix import ace_fix_mec
+from accfix.epub import Epub
+from accfix.fix import fix_epub
+from accfix.lang import detect_epub_lang
+from accfix.synth import BookSpec, make_book
+from accfix.zfile import ZipFileR
+
+ROUNDS = 5
+
+
+def open_pages(path):
+    epub = Epub(path, clone=False)
+    pages = epub.pages()
+    epub.close()
+    return pages
+
+
+def read_pages(epub, pages):
+    return sum(len(epub.read(page)) for page in pages)
+
+
+def write_page(epub):
+    page = epub.pages()[0]
+    epub.write(page, epub.read(page))
+    epub.close()
+
+
+def write_pages(epub):
+    with epub.transaction():
+        for page in epub.pages():
+            epub.write(page, epub.read(page))
+    epub.close()
+
+
+def remove_page(zf):
+    zf.remove("OEBPS/page_0001.xhtml")
+    zf.close()
+
+
+def fix_mec(epub):
+    for _ in ace_fix_mec(epub):
+        pass
+    epub.close()
+
+
+def test_epub_open_and_pages(benchmark, book):
+    assert len(benchmark(open_pages, book)) == 200
+
+
+def test_epub_read(benchmark, book):
+    epub = Epub(book, clone=False)
+    assert benchmark(read_pages, epub, epub.pages()) > 0
+    epub.close()
+
+
+def test_epub_write(benchmark, book_copy):
+    setup = lambda: ((Epub(book_copy(), clone=False),), {})  # noqa: E731
+    benchmark.pedantic(write_page, setup=setup, rounds=ROUNDS)
+
+
+def test_epub_write_transaction(benchmark, book_copy):
+    setup = lambda: ((Epub(book_copy(), clone=False),), {})  # noqa: E731
+    benchmark.pedantic(write_pages, setup=setup, rounds=ROUNDS)
+
+
+def test_zipfile_remove(benchmark, book_copy):
+    setup = lambda: ((ZipFileR(book_copy(), mode="a"),), {})  # noqa: E731
+    benchmark.pedantic(remove_page, setup=setup, rounds=ROUNDS)
+
+
+@pytest.mark.parametrize("lang", ["en", "de", "fr"])
+def test_detect_epub_lang(benchmark, tmp_path, lang):
+    book = make_book(tmp_path / f"{lang}.epub", BookSpec(pages=50, image_size=1000, lang=lang))
+    epub = Epub(book, clone=False)
+    detect_epub_lang(epub)  # Warm up the cached detector
+    assert benchmark(detect_epub_lang, epub) == lang
+    epub.close()
+
+
+def test_ace_fix_mec(benchmark, book_copy):
+    setup = lambda: ((Epub(book_copy(), clone=False),), {})  # noqa: E731
+    benchmark.pedantic(fix_mec, setup=setup, rounds=ROUNDS)
+
+
+def test_legacy_fix_epub(benchmark, book_copy):
+    setup = lambda: ((str(book_copy()),), {})  # noqa: E731
+    benchmark.pedantic(fix_epub, setup=setup, rounds=ROUNDS)
@@ -0,0 +1,48 @@
+import os
+from accfix.cache import EPUB_NAME, ResultCache, content_key
+
+
+def age(cache, key, seconds):
+    os.utime(cache.root / key, (seconds, seconds))
+
+
+def test_get_returns_stored_entry(tmp_path):
+    cache = ResultCache(tmp_path)
+    assert cache.get("missing") is None
+    entry = cache.put("key", b"epub", lang="en")
+    assert entry.path.read_bytes() == b"epub"
+    assert cache.get("key") == entry
+
+
+def test_content_key_matches_for_path_and_bytes(tmp_path):
+    path = tmp_path / "book.epub"
+    path.write_bytes(b"epub")
+    assert content_key(path) == content_key(b"epub") != content_key(b"other")
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=250)
+    for i, key in enumerate(["a", "b"]):
+        cache.put(key, b"x" * 100)
+        age(cache, key, 1000 + i)
+    assert cache.get("a")  # Touching "a" makes "b" the oldest entry
+    cache.put("c", b"x" * 100)
+    assert cache.get("a") and cache.get("c")
+    assert cache.get("b") is None
+
+
+def test_keeps_new_entry_over_size_limit(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=50)
+    cache.put("small", b"x" * 10)
+    entry = cache.put("large", b"x" * 100)
+    assert entry.path.exists()
+    assert cache.get("small") is None
+
+
+def test_put_on_existing_key_keeps_entry(tmp_path):
+    cache = ResultCache(tmp_path)
+    cache.put("key", b"first", lang="en")
+    entry = cache.put("key", b"second", lang="en")
+    assert entry.path.read_bytes() == b"first"
+    assert [p.name for p in tmp_path.iterdir()] == ["key"]
+    assert (tmp_path / "key" / EPUB_NAME).exists()
@@ -0,0 +1,28 @@
+import json
+import shutil
+from accfix.cli import collect_inputs, main
+
+
+def test_explicit_fix_named_input_is_used(small_book):
+    quick = shutil.copyfile(small_book, small_book.with_name("quick_fix.epub"))
+    assert collect_inputs([str(quick)]) == [quick.resolve()]
+
+
+def test_scans_skip_fixed_outputs(small_book):
+    shutil.copyfile(small_book, small_book.with_name("small_fix.epub"))
+    assert collect_inputs([str(small_book.parent)]) == [small_book.resolve()]
+    assert collect_inputs([str(small_book.parent / "*.epub")]) == [small_book.resolve()]
+
+
+def test_summary_has_one_record_per_book(small_book, tmp_path):
+    other = shutil.copyfile(small_book, small_book.with_name("other.epub"))
+    summary = tmp_path / "summary.jsonl"
+    out = tmp_path / "out"
+    args = [str(small_book), str(other), "-o", str(out), "-j", "2", "-s", str(summary)]
+    assert main(args) == 0
+    records = [json.loads(line) for line in summary.read_text().splitlines()]
+    assert sorted(r["output"] for r in records) == [
+        str(out / "other_fix.epub"),
+        str(out / "small_fix.epub"),
+    ]
+    assert {(r["status"], r["lang"]) for r in records} == {("fixed", "en")}
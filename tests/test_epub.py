@@ -0,0 +1,127 @@
+import os
+import stat
+import tempfile
+from io import BytesIO
+from zipfile import BadZipFile, ZipFile
+import pytest
+from accfix.epub import Epub
+
+PAGE = "OEBPS/page_0001.xhtml"
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_commit_in_place_keeps_file_mode(small_book):
+    os.chmod(small_book, 0o644)
+    epub = Epub(small_book, clone=False)
+    with epub.transaction():
+        epub.write(PAGE, b"<html/>")
+    epub.close()
+    assert mode(small_book) == 0o644
+
+
+def test_commit_to_clone_keeps_file_mode(small_book):
+    os.chmod(small_book, 0o640)
+    fixed = small_book.with_name("fixed.epub")
+    epub = Epub(small_book, clone_path=fixed)
+    with epub.transaction():
+        epub.write(PAGE, b"<html/>")
+    epub.close()
+    assert mode(fixed) == 0o640
+
+
+def test_in_memory_epub_is_read_only_until_written(small_book):
+    data = small_book.read_bytes()
+    buffer = BytesIO(data)
+    epub = Epub(buffer, clone=False)
+    assert epub.pages()
+    epub.close()
+    assert buffer.getvalue() == data
+
+
+def test_in_memory_epub_rejects_non_zip_data():
+    buffer = BytesIO(b"junk")
+    with pytest.raises(BadZipFile):
+        Epub(buffer, clone=False)
+    assert buffer.getvalue() == b"junk"
+
+
+def test_commit_writes_back_to_caller_buffer(small_book):
+    buffer = BytesIO(small_book.read_bytes())
+    epub = Epub(buffer, clone=False)
+    with epub.transaction():
+        epub.write(PAGE, b"<html/>")
+    epub.close()
+    with ZipFile(buffer) as reader:
+        assert reader.testzip() is None
+        assert reader.read(PAGE) == b"<html/>"
+
+
+def members(path):
+    with ZipFile(path) as reader:
+        assert reader.testzip() is None
+        return {info.filename: (info.CRC, reader.read(info)) for info in reader.infolist()}
+
+
+def test_transaction_commit(small_book):
+    before = members(small_book)
+    epub = Epub(small_book, clone=False)
+    with epub.transaction():
+        epub.write(PAGE, b"<html/>")
+        epub.write("OEBPS/new.xhtml", b"<new/>")
+        assert epub.read(PAGE) == b"<html/>"
+    epub.close()
+    after = members(small_book)
+    assert after[PAGE][1] == b"<html/>"
+    assert after.pop("OEBPS/new.xhtml")[1] == b"<new/>"
+    assert {name: m for name, m in after.items() if name != PAGE} == {
+        name: m for name, m in before.items() if name != PAGE
+    }
+
+
+def test_transaction_rollback(small_book):
+    data = small_book.read_bytes()
+    epub = Epub(small_book, clone=False)
+    with pytest.raises(RuntimeError):
+        with epub.transaction():
+            epub.write(PAGE, b"<html/>")
+            raise RuntimeError("abort")
+    assert epub.read(PAGE) != b"<html/>"
+    epub.close()
+    assert small_book.read_bytes() == data
+
+
+def test_opf_write_invalidates_package(small_book):
+    epub = Epub(small_book, clone=False)
+    opf = epub.opf_path()
+    shorter = epub.read(opf).replace(b'<itemref idref="p3"/>', b"")
+    assert len(epub.pages()) == 3
+    epub.begin()
+    epub.write(opf, shorter)
+    assert len(epub.pages()) == 2
+    epub.rollback()
+    assert len(epub.pages()) == 3
+    with epub.transaction():
+        epub.write(opf, shorter)
+    assert len(epub.pages()) == 2
+    epub.close()
+    reopened = Epub(small_book, clone=False)
+    assert len(reopened.pages()) == 2
+    reopened.close()
+
+
+def test_read_only_clone_creates_no_temp_dir(small_book, tmp_path, monkeypatch):
+    temp = tmp_path / "temp"
+    temp.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(temp))
+    epub = Epub(small_book)
+    epub.pages()
+    epub.close()
+    assert not list(temp.iterdir())
+    epub = Epub(small_book)
+    epub.write(PAGE, b"<html/>")
+    epub.close()
+    assert epub.path.parent.parent == temp
+    assert ZipFile(epub.path).read(PAGE) == b"<html/>"
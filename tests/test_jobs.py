@@ -0,0 +1,70 @@
+import os
+import signal
+import shutil
+import time
+import pytest
+from accfix import jobs
+from accfix.jobs import INPUT_NAME, WORKER_DIED, JobQueue
+
+
+def slow_fix(epub):
+    time.sleep(60)
+    yield
+
+
+def wait_for(queue, job_id, status, timeout=30):
+    deadline = time.monotonic() + timeout
+    while (job := queue.get(job_id)).status != status:
+        assert time.monotonic() < deadline, f"job is {job.status}, expected {status}"
+        time.sleep(0.05)
+    return job
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(tmp_path / "jobs", workers=1)
+    yield queue
+    queue.close()
+
+
+def test_job_is_fixed(queue, small_book):
+    job_id = queue.submit(small_book.read_bytes(), "small.epub")
+    job = wait_for(queue, job_id, "done")
+    assert job.lang == "en"
+    assert queue.artifact(job_id).exists()
+    assert queue.events(job_id)
+
+
+def test_dead_worker_fails_job_and_pool_recovers(queue, small_book, monkeypatch):
+    monkeypatch.setattr(jobs, "ace_fix_mec", slow_fix)
+    stuck = queue.submit(small_book.read_bytes(), "stuck.epub")
+    wait_for(queue, stuck, "running")
+    for pid in list(queue.pool._processes):
+        os.kill(pid, signal.SIGKILL)
+    assert wait_for(queue, stuck, "error").error == WORKER_DIED
+    monkeypatch.undo()
+    job_id = queue.submit(small_book.read_bytes(), "small.epub")
+    wait_for(queue, job_id, "done")
+
+
+def test_jobs_of_live_queues_are_not_taken_over(queue, small_book, monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs, "ace_fix_mec", slow_fix)
+    job_id = queue.submit(small_book.read_bytes(), "small.epub")
+    wait_for(queue, job_id, "running")
+    other = JobQueue(queue.root, workers=1)
+    other.close()
+    assert queue.query("SELECT owner FROM jobs WHERE id = ?", (job_id,)) == [(queue.owner,)]
+    for pid in list(queue.pool._processes):
+        os.kill(pid, signal.SIGKILL)  # Don't wait for the slow fix on close
+
+
+def test_orphaned_jobs_are_resubmitted(queue, small_book):
+    (queue.root / "orphan").mkdir()
+    shutil.copyfile(small_book, queue.root / "orphan" / INPUT_NAME)
+    queue.query(
+        "INSERT INTO jobs (id, name, status, created, updated, owner, heartbeat) "
+        "VALUES ('orphan', 'small.epub', 'running', 0, 0, 'gone', 0)"
+    )
+    queue.beat()
+    wait_for(queue, "orphan", "done")
+    assert queue.query("SELECT owner FROM jobs WHERE id = 'orphan'") == [(queue.owner,)]
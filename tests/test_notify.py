@@ -0,0 +1,122 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import pytest
+from accfix.notify import Notification, Notifier, coalesce
+
+BOT = {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+MESSAGE = {"message_id": 1, "date": 0, "chat": {"id": 42, "type": "private"}}
+
+
+class FakeBotHandler(BaseHTTPRequestHandler):
+    """Minimal Telegram Bot API that records calls and can answer with rate limits"""
+
+    def do_POST(self):
+        method = self.path.rsplit("/", 1)[-1]
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        if method == "getMe":
+            self.reply({"ok": True, "result": BOT})
+            return
+        if server.rate_limits > 0:
+            server.rate_limits -= 1
+            error = {"error_code": 429, "description": "Too Many Requests"}
+            self.reply({"ok": False, **error, "parameters": {"retry_after": 1}}, 429)
+            return
+        if server.failures > 0:
+            server.failures -= 1
+            self.reply({"ok": False, "error_code": 502, "description": "Bad Gateway"}, 502)
+            return
+        if method == "sendMessage":
+            server.calls.append((method, fields(self.headers, body).get("text")))
+        else:
+            server.calls.append((method, None))
+        self.reply({"ok": True, "result": MESSAGE})
+
+    def reply(self, payload, status=200):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def fields(headers, body):
+    if headers.get("Content-Type", "").startswith("application/json"):
+        return json.loads(body)
+    return {key: values[0] for key, values in parse_qs(body.decode()).items()}
+
+
+@pytest.fixture
+def fake_bot():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBotHandler)
+    server.calls = []
+    server.rate_limits = 0
+    server.failures = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def make_notifier(server):
+    base_url = f"http://127.0.0.1:{server.server_port}/bot"
+    return Notifier(token="123:abc", chat_id="42", batch_window=0.2, base_url=base_url)
+
+
+def test_coalesce_counts_repeated_messages():
+    items = [Notification("a"), Notification("b"), Notification("a"), Notification("c", b"x")]
+    merged = coalesce(items)
+    assert [m.text for m in merged] == ["a (2x)\n\nb", "c"]
+    assert merged[1].document == b"x"
+
+
+def test_notifications_are_batched(fake_bot):
+    notifier = make_notifier(fake_bot)
+    for text in ("done: a.epub", "done: b.epub", "done: a.epub"):
+        notifier.notify(text)
+    notifier.notify("failed: c.epub", b"PK", "c.epub")
+    notifier.close()
+    assert fake_bot.calls == [
+        ("sendMessage", "done: a.epub (2x)\n\ndone: b.epub"),
+        ("sendDocument", None),
+    ]
+
+
+def test_rate_limits_are_retried(fake_bot):
+    fake_bot.rate_limits = 1
+    notifier = make_notifier(fake_bot)
+    notifier.notify("done: a.epub")
+    notifier.close()
+    assert fake_bot.calls == [("sendMessage", "done: a.epub")]
+
+
+def test_network_errors_back_off(fake_bot):
+    fake_bot.failures = 3
+    notifier = make_notifier(fake_bot)
+    notifier.backoff = 0.01
+    notifier.notify("done: a.epub")
+    notifier.close()
+    assert fake_bot.calls == [("sendMessage", "done: a.epub")]
+
+
+def test_gives_up_after_retries(fake_bot):
+    fake_bot.failures = Notifier.retries
+    notifier = make_notifier(fake_bot)
+    notifier.backoff = 0.01
+    notifier.notify("lost")
+    notifier.close()
+    assert fake_bot.calls == []
+
+
+def test_disabled_without_credentials(monkeypatch):
+    monkeypatch.delenv("TELEGRAM_BOT_TOKEN", raising=False)
+    monkeypatch.delenv("TELEGRAM_CHAT_ID", raising=False)
+    notifier = Notifier()
+    notifier.notify("dropped")
+    notifier.close()
+    assert not notifier.thread.is_alive()
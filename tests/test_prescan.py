@@ -0,0 +1,68 @@
+import zipfile
+from pathlib import Path
+from accfix.ace_fix import FIXER_VERSION, ace_fix_mec
+from accfix.epub import Epub
+from accfix.prescan import INDEX_NAME, PageIndex, needs_fix, work_dir
+
+PAGE = "OEBPS/page_0001.xhtml"
+LINK = b'<a class="trn_link" href="#p1"%s></a>'
+HOTSPOT = b'<div class="hotspot"><a href="p.xhtml"%s></a></div>'
+TITLE = b' title="Link area"'
+
+
+def page(lang=b' xml:lang="en"', link_title=TITLE, hotspot_title=TITLE):
+    html = b'<html xmlns="http://www.w3.org/1999/xhtml"%s><body>%s%s</body></html>'
+    return html % (lang, LINK % link_title, HOTSPOT % hotspot_title)
+
+
+def fix(epub):
+    for _ in ace_fix_mec(epub):
+        pass
+    epub.close()
+
+
+def test_compliant_page_needs_no_fix():
+    assert not needs_fix(page(), "en")
+
+
+def test_wrong_or_missing_lang_needs_fix():
+    assert needs_fix(page(lang=b' xml:lang="de"'), "en")
+    assert needs_fix(page(lang=b""), "en")
+    assert needs_fix(page(lang=b' lang="en"'), "en")
+
+
+def test_partial_titles_need_fix():
+    assert needs_fix(page(link_title=b""), "en")
+    assert needs_fix(page(hotspot_title=b""), "en")
+    assert needs_fix(page(link_title=b' title="Next"'), "en")
+
+
+def test_index_with_stale_stamp_is_ignored(tmp_path):
+    book = tmp_path / "book.epub"
+    index = PageIndex(book, "1:en")
+    index.record(Path(PAGE), b"data")
+    index.save()
+    assert (work_dir(book) / INDEX_NAME).exists()
+    assert PageIndex(book, "1:en").known(Path(PAGE), b"data")
+    assert not PageIndex(book, "1:en").known(Path(PAGE), b"changed")
+    assert not PageIndex(book, "2:en").known(Path(PAGE), b"data")
+
+
+def test_rerun_leaves_fixed_book_unchanged(small_book):
+    fix(Epub(small_book, clone=False))
+    data, mtime = small_book.read_bytes(), small_book.stat().st_mtime_ns
+    fix(Epub(small_book, clone=False))
+    assert small_book.read_bytes() == data
+    assert small_book.stat().st_mtime_ns == mtime
+
+
+def test_changed_page_of_indexed_book_is_fixed(small_book):
+    fix(Epub(small_book, clone=False))
+    index = PageIndex(small_book, f"{FIXER_VERSION}:en")
+    epub = Epub(small_book, clone=False)
+    assert index.known(Path(PAGE), epub.read(PAGE))
+    epub.write(PAGE, epub.read(PAGE).replace(TITLE, b""))
+    epub.close()
+    fix(Epub(small_book, clone=False))
+    with zipfile.ZipFile(small_book) as reader:
+        assert TITLE in reader.read(PAGE)
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import pytest
+from accfix import ace_check
+from accfix.report import AceReport
+
+REPORT = {
+    "dct:title": "Ace Report",
+    "dct:date": "2026-01-01 00:00:00",
+    "earl:result": {"earl:outcome": "fail"},
+    "earl:testSubject": {"url": "book.epub", "metadata": {"dc:title": "Synthetic"}},
+    "outlines": {"toc": "<ul></ul>"},
+    "assertions": [
+        {
+            "earl:testSubject": {"url": "page_0001.xhtml"},
+            "assertions": [
+                {
+                    "earl:test": {"dct:title": "link-name", "earl:impact": "serious"},
+                    "earl:result": {"earl:outcome": "fail", "dct:description": "No title"},
+                },
+                {
+                    "earl:test": {"dct:title": "image-alt", "earl:impact": "critical"},
+                    "earl:result": {"earl:outcome": "pass"},
+                },
+            ],
+        }
+    ],
+}
+
+STUB_ACE = """#!{python}
+import pathlib, sys, time
+print("\\x1b[32minfo\\x1b[0m Processing", sys.argv[-1], flush=True)
+if "broken" in sys.argv[-1]:
+    sys.exit(1)
+if "hung" in sys.argv[-1]:
+    time.sleep(60)
+if "slow" in sys.argv[-1]:
+    running = pathlib.Path(sys.argv[3]).with_suffix(".running")
+    running.touch()
+    with open(running.parent / "concurrency.log", "a") as log:
+        log.write(f"{{len(list(running.parent.glob('*.running')))}}\\n")
+    time.sleep(0.3)
+    running.unlink()
+pathlib.Path(sys.argv[3], "report.json").write_text({report!r})
+"""
+
+
+@pytest.fixture
+def stub_ace(tmp_path, monkeypatch):
+    stub = tmp_path / "ace"
+    stub.write_text(STUB_ACE.format(python=sys.executable, report=json.dumps(REPORT)))
+    os.chmod(stub, 0o755)
+    monkeypatch.setattr(ace_check, "ace_path", stub)
+    return stub
+
+
+def test_report_uses_publication_title(tmp_path):
+    path = tmp_path / "report.json"
+    path.write_text(json.dumps(REPORT))
+    report = AceReport.load(path)
+    assert report.title == "Synthetic"
+    assert report.outcome == "fail"
+    assert report.query(impact="serious")[0].document == "page_0001.xhtml"
+    assert len(report) == 1
+
+
+def test_report_title_list_uses_first_title(tmp_path):
+    path = tmp_path / "report.json"
+    subject = {"url": "book.epub", "metadata": {"dc:title": ["Main", "Sub"]}}
+    path.write_text(json.dumps(dict(REPORT, **{"earl:testSubject": subject})))
+    assert AceReport.load(path).title == "Main"
+
+
+def test_ace_check_returns_report(stub_ace, tmp_path):
+    steps = ace_check.ace_check(tmp_path / "book.epub")
+    lines = []
+    with pytest.raises(StopIteration) as stop:
+        while True:
+            lines.append(next(steps))
+    assert lines == [f"info Processing {tmp_path / 'book.epub'}"]
+    assert stop.value.value.title == "Synthetic"
+
+
+def test_ace_check_raises_on_failure(stub_ace, tmp_path):
+    lines = []
+    with pytest.raises(RuntimeError):
+        for line in ace_check.ace_check(tmp_path / "broken.epub"):
+            lines.append(line)
+    assert lines[-1] == "Ace command failed with return code 1"
+
+
+def test_ace_check_async_raises_on_failure(stub_ace, tmp_path):
+    with pytest.raises(RuntimeError):
+        asyncio.run(ace_check.check_one(tmp_path / "broken.epub", asyncio.Semaphore(1)))
+
+
+def test_ace_check_async_kills_hung_check(stub_ace, tmp_path):
+    start = time.monotonic()
+    results = asyncio.run(ace_check.check_many([tmp_path / "hung.epub"], timeout=1))
+    assert isinstance(results[tmp_path / "hung.epub"], TimeoutError)
+    assert time.monotonic() - start < 10
+
+
+def test_check_many_limits_concurrency(stub_ace, tmp_path):
+    fps = [tmp_path / f"slow{i}.epub" for i in range(5)]
+    results = asyncio.run(ace_check.check_many(fps, limit=2))
+    assert all(report.title == "Synthetic" for report in results.values())
+    counts = [int(n) for n in (tmp_path / "concurrency.log").read_text().split()]
+    assert len(counts) == 5
+    assert max(counts) <= 2
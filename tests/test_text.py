@@ -0,0 +1,29 @@
+import pytest
+from lxml import etree
+from accfix.text import xml_text
+
+PAGE = b"""<?xml version="1.0" encoding="utf-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml"><head><title>Title</title>
+<style>p { color: red; }</style>
+<script type="text/javascript">var x = 1 &lt; 2;</script></head>
+<body><p>First <b>bold</b> text</p><script><![CDATA[alert(1)]]></script><p>Second</p></body></html>"""
+
+
+def test_extracts_text_nodes():
+    assert xml_text(PAGE) == "Title\nFirst\nbold\ntext\nSecond"
+
+
+def test_skips_nested_tags_in_skipped_elements():
+    data = b"<html><body><style><p>styled</p> tail</style><p>after</p></body></html>"
+    assert xml_text(data) == "after"
+
+
+def test_small_chunks_give_same_text():
+    assert xml_text(PAGE, chunk_size=7) == xml_text(PAGE)
+
+
+def test_stops_parsing_at_budget():
+    data = b"<html><p>" + b"word " * 10 + b"</p>" + b"<p>more</p>" * 1000 + b"<broken"
+    assert xml_text(data, budget=10, chunk_size=64).startswith("word")
+    with pytest.raises(etree.XMLSyntaxError):
+        xml_text(data)
@@ -0,0 +1,55 @@
+import json
+from accfix.epub import Epub
+from accfix.verify import DIFF_NAME, verify
+
+PAGE = "OEBPS/page_0001.xhtml"
+
+
+class FakeAce:
+    """Runner that reports a link-name violation per spine page without a link title"""
+
+    def __init__(self):
+        self.checked = []
+
+    def __call__(self, fp):
+        epub = Epub(fp, clone=False)
+        assertions = []
+        for page in epub.pages():
+            outcome = "pass" if b'title="Link area"' in epub.read(page) else "fail"
+            test = {"dct:title": "link-name", "earl:impact": "serious", "earl:rulesetTags": []}
+            assertions.append(
+                {
+                    "earl:testSubject": {"url": page.name},
+                    "assertions": [{"earl:test": test, "earl:result": {"earl:outcome": outcome}}],
+                }
+            )
+        self.checked.append([page.name for page in epub.pages()])
+        epub.close()
+        return {
+            "outlines": {"toc": f"{len(assertions)} pages"},
+            "earl:result": {"earl:outcome": "pass"},
+            "violationSummary": {},
+            "assertions": assertions,
+        }
+
+
+def test_second_run_merges_rechecked_documents(small_book):
+    runner = FakeAce()
+    first = verify(small_book, runner)
+    assert first["violationSummary"] == {}
+    epub = Epub(small_book, clone=False)
+    epub.write(PAGE, epub.read(PAGE).replace(b'class="trn_link"', b'title="Link area"'))
+    epub.close()
+    report = verify(small_book, runner)
+    assert runner.checked[1] == ["page_0001.xhtml"]
+    assert report["outlines"] == {"toc": "3 pages"}
+    assert len(report["assertions"]) == 3
+    assert report["earl:result"]["earl:outcome"] == "fail"
+    assert report["violationSummary"]["other"]["serious"] == 2
+    assert report["violationSummary"]["total"]["total"] == 2
+    diff = json.loads((small_book.parent / "small_report" / DIFF_NAME).read_text())
+    assert diff["fixed"] == [[PAGE, "link-name", "serious"]]
+    assert diff["new"] == []
+    assert len(diff["remain"]) == 2
+    assert verify(small_book, runner) == report
+    assert len(runner.checked) == 2
@@ -0,0 +1,129 @@
+import os
+import stat
+import zipfile
+from io import BytesIO
+from accfix.zfile import ZipFileR, copy_raw
+
+PAGE = "OEBPS/page_0001.xhtml"
+PAGES = ["OEBPS/page_0001.xhtml", "OEBPS/page_0002.xhtml"]
+IMAGE = "OEBPS/images/page_0001.jpg"
+
+
+class Unseekable:
+    """Write-only stream that makes ZipFile use data descriptors"""
+
+    def __init__(self):
+        self.buffer = BytesIO()
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+    def flush(self):
+        pass
+
+
+def contents(path):
+    with zipfile.ZipFile(path) as reader:
+        return {info.filename: reader.read(info) for info in reader.infolist()}
+
+
+def names(path):
+    with zipfile.ZipFile(path) as reader:
+        assert reader.testzip() is None
+        return reader.namelist()
+
+
+def test_copy_raw_stored_and_deflated_members(small_book, tmp_path):
+    copy = tmp_path / "copy.epub"
+    with zipfile.ZipFile(small_book) as src, ZipFileR(copy, mode="w") as dst:
+        for info in src.infolist():
+            copy_raw(src, dst, info)
+    with zipfile.ZipFile(copy) as reader:
+        assert reader.testzip() is None
+        assert reader.getinfo("mimetype").compress_type == zipfile.ZIP_STORED
+        assert reader.getinfo(PAGE).compress_type == zipfile.ZIP_DEFLATED
+    assert contents(copy) == contents(small_book)
+
+
+def test_copy_raw_data_descriptor_members(tmp_path):
+    stream = Unseekable()
+    with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("a.txt", b"a" * 1000)
+        zf.writestr("b.bin", os.urandom(100), compress_type=zipfile.ZIP_STORED)
+    source = BytesIO(stream.buffer.getvalue())
+    copy = tmp_path / "copy.zip"
+    with zipfile.ZipFile(source) as src, ZipFileR(copy, mode="w") as dst:
+        assert all(info.flag_bits & 0x08 for info in src.infolist())
+        for info in src.infolist():
+            copy_raw(src, dst, info)
+    assert contents(copy) == contents(source)
+
+
+def test_remove_keeps_archive_readable_before_close(small_book):
+    zf = ZipFileR(small_book, mode="a")
+    zf.remove(PAGE)
+    with zipfile.ZipFile(small_book) as reader:
+        assert reader.testzip() is None
+        assert PAGE not in reader.namelist()
+    zf.close()
+    assert [p.name for p in small_book.parent.iterdir()] == [small_book.name]
+
+
+def test_remove_many(small_book):
+    expected = contents(small_book)
+    with ZipFileR(small_book, mode="a") as zf:
+        zf.remove_many([PAGES[0], zf.getinfo(PAGES[1])])
+    for name in PAGES:
+        del expected[name]
+    assert contents(small_book) == expected
+
+
+def test_remove_many_in_memory(small_book):
+    buffer = BytesIO(small_book.read_bytes())
+    with ZipFileR(buffer, mode="a") as zf:
+        zf.remove_many(PAGES)
+    with zipfile.ZipFile(buffer) as reader:
+        assert reader.testzip() is None
+        assert not set(PAGES) & set(reader.namelist())
+
+
+def test_rewrite_keeps_file_mode(small_book):
+    os.chmod(small_book, 0o644)
+    with ZipFileR(small_book, mode="a") as zf:
+        zf.remove(PAGE)
+    assert stat.S_IMODE(os.stat(small_book).st_mode) == 0o644
+
+
+def test_replace_appends_and_close_compacts(small_book):
+    expected = contents(small_book)
+    zf = ZipFileR(small_book, mode="a")
+    zf.reclaim_ratio = 1.0  # Keep superseded entries until close
+    for i in range(3):
+        zf.replace(PAGE, f"version {i}".encode())
+    assert zf.wasted_bytes() > 0
+    assert zf.read(PAGE) == b"version 2"
+    zf.close()
+    expected[PAGE] = b"version 2"
+    assert len(names(small_book)) == len(set(names(small_book)))
+    assert contents(small_book) == expected
+
+
+def test_compact_drops_superseded_entries(small_book):
+    zf = ZipFileR(small_book, mode="a")
+    zf.reclaim_ratio = 1.0
+    zf.replace(PAGE, b"new")
+    assert zf.compact() == 1
+    assert zf.wasted_bytes() == 0
+    assert [info.filename for info in zf.filelist].count(PAGE) == 1
+    assert zf.read(PAGE) == b"new"
+    zf.close()
+    assert contents(small_book)[PAGE] == b"new"
+
+
+def test_reclaim_compacts_over_ratio(small_book):
+    zf = ZipFileR(small_book, mode="a")
+    zf.reclaim_ratio = 0.0
+    zf.replace(IMAGE, b"small")
+    assert zf.wasted_bytes() == 0
+    zf.close()
+    assert contents(small_book)[IMAGE] == b"small"